@@ -1,14 +1,27 @@
 import os
 import random
-from collections import deque
 from math import radians, acos, cos, sin, asin, sqrt, atan2, degrees
-from radio import Radio
-import time
+import clock
+from classifier import APPROACH, DEPARTURE, PhaseClassifier
+from geometry import (ALTITUDE_IN_RANGE, IN_MONITORING_RADIUS, IN_TRIGGER_RADIUS, MOVING_TOWARDS,
+                      SPEED_IN_RANGE, TRIGGER_READY)
+from predictor import TrackPredictor
 
 class Aircraft:
-    def __init__(self, config, data, logger):
-        self.config = config
-        self.logger = logger
+    # Fixed set of fields per aircraft: no per-instance __dict__, and the config,
+    # logger and radio are shared through the FleetStore instead of copied onto
+    # every aircraft.
+    __slots__ = (
+        'store', 'slot', 'callsign', 'category', 'id', 'track', 'altitude', 'speed',
+        'latitude', 'longitude', 'vert_rate', 'seen_count', 'last_seen',
+        'has_triggered_audio', 'held_for_chatter', 'classifier',
+        'distance_from_center_miles', 'closest_distance', 'geometry_fresh', 'flags',
+        'predictor',
+    )
+
+    def __init__(self, store, slot, data):
+        self.store = store
+        self.slot = slot
         self.callsign = data.get("flight", "Unknown")
         self.category = data.get("category", "Unknown")
         self.id = data.get("hex", 'Unknown')
@@ -17,18 +30,33 @@ class Aircraft:
         self.speed = self.safe_int(data.get("gs", 0))
         self.latitude = self.safe_float(data.get("lat", 0))
         self.longitude = self.safe_float(data.get("lon", 0))
-        self.distance_from_center_miles = self.calculate_distance(config['flight_deck_latitude'], config['flight_deck_longitude'])
-        self.altitude_history = deque(maxlen=3)  # Store last 3 altitude samples
+        self.distance_from_center_miles = None
+        self.geometry_fresh = False  # Filled in by FleetStore.update_geometry or refresh_geometry
+        self.classifier = PhaseClassifier()  # approach / departure / overflight
         self.seen_count = 1
-        self.is_landing = False
-        self.is_takeoff = False
-        self.last_seen = time.time()
+        self.last_seen = clock.time()
         self.vert_rate = self.safe_int(data.get("baro_rate", 0))
-        self.radio = Radio(config, logger)  # Each aircraft has its own Radio instance
         self.has_triggered_audio = False  # Flag to track if audio has been triggered
+        self.held_for_chatter = False  # Trigger-ready but held by the chatter budget (counted once in metrics)
+        store.write_kinematics(slot, self.latitude, self.longitude, self.track, self.speed, self.altitude)
+        self.predictor = TrackPredictor(self.config['flight_deck_latitude'], self.config['flight_deck_longitude'])
+        if "lat" in data and "lon" in data:
+            self.predictor.update(self.last_seen, self.latitude, self.longitude, self.speed, self.track)
 
         #self.logger.info(f"Initialized Aircraft: {self.callsign}")
 
+    @property
+    def config(self):
+        return self.store.config
+
+    @property
+    def logger(self):
+        return self.store.logger
+
+    @property
+    def radio(self):
+        return self.store.radio
+
     def safe_int(self, value, default=0):
         try:
             return int(value)
@@ -43,7 +71,7 @@ class Aircraft:
 
     def update_data(self, data):
         self.seen_count += 1
-        self.last_seen = time.time()
+        self.last_seen = clock.time()
         self.vert_rate = self.safe_int(data.get("baro_rate", 0))
         self.callsign = data.get("flight", self.callsign)
         self.category = data.get("category", self.category)
@@ -52,13 +80,61 @@ class Aircraft:
         self.speed = self.safe_int(data.get("gs", self.speed))
         self.latitude = self.safe_float(data.get("lat", self.latitude))
         self.longitude = self.safe_float(data.get("lon", self.longitude))
-        self.distance_from_center_miles = self.calculate_distance(self.config['flight_deck_latitude'], self.config['flight_deck_longitude'])
+        self.geometry_fresh = False
+        self.store.write_kinematics(self.slot, self.latitude, self.longitude, self.track, self.speed, self.altitude)
+        # Only real position reports go into the predictor; a poll without one would look like a stop
+        if "lat" in data and "lon" in data:
+            self.predictor.update(self.last_seen, self.latitude, self.longitude, self.speed, self.track)
         self.update_state()
 
+    # Store the results of a batched geometry pass (see geometry.compute_fleet_geometry)
+    def apply_geometry(self, distance, along_track, flags):
+        self.distance_from_center_miles = distance
+        self.closest_distance = along_track
+        self.flags = flags
+        self.geometry_fresh = True
+
+    # Scalar fallback for when the aircraft is used outside a fleet pass
+    def refresh_geometry(self):
+        config = self.config
+        distance = self.calculate_distance(config['flight_deck_latitude'], config['flight_deck_longitude'])
+        flags = 0
+        if distance <= config['aircraft_monitoring_radius']:
+            flags |= IN_MONITORING_RADIUS
+        if distance <= config['aircraft_trigger_radius']:
+            flags |= IN_TRIGGER_RADIUS
+        if config['min_speed_knots'] <= self.speed <= config['max_speed_knots']:
+            flags |= SPEED_IN_RANGE
+        if config['min_altitude_feet'] <= self.altitude <= config['max_altitude_feet']:
+            flags |= ALTITUDE_IN_RANGE
+        if self.calculate_moving_towards_flight_deck():
+            flags |= MOVING_TOWARDS
+        self.apply_geometry(distance, self.calculate_along_track_distance(), flags)
+
+    # Predicate flags for this tick, refreshed only if the aircraft changed since the last geometry pass
+    def current_flags(self):
+        if not self.geometry_fresh:
+            self.refresh_geometry()
+        return self.flags
+
+    # In the trigger radius, speed and altitude in range, and heading towards the deck
+    def is_trigger_ready(self):
+        return self.current_flags() & TRIGGER_READY == TRIGGER_READY
+
     def update_state(self):
-        self.altitude_history.append(self.vert_rate)  # Update altitude history
-        self.is_landing = self.is_landing_from_east()
-        self.is_takeoff = self.is_taking_off_from_west()
+        self.classifier.update(self.config, self.last_seen, self.latitude, self.longitude, self.altitude, self.vert_rate, self.track)
+
+    @property
+    def phase(self):
+        return self.classifier.phase
+
+    @property
+    def is_landing(self):
+        return self.classifier.phase == APPROACH
+
+    @property
+    def is_takeoff(self):
+        return self.classifier.phase == DEPARTURE
 
     def calculate_distance(self, lat1, lon1):
         lat2, lon2 = self.latitude, self.longitude
@@ -76,6 +152,11 @@ class Aircraft:
         return c * r
 
     def calculate_closest_distance(self):
+        if not self.geometry_fresh:
+            self.refresh_geometry()
+        return self.closest_distance
+
+    def calculate_along_track_distance(self):
         lat1, lon1 = self.config['flight_deck_latitude'], self.config['flight_deck_longitude']
         lat2, lon2 = self.latitude, self.longitude
 
@@ -96,16 +177,29 @@ class Aircraft:
         bearing = (bearing + 360) % 360
 
         relative_bearing = (self.track - bearing + 360) % 360
-        cross_track_distance = abs(asin(sin(distance / 3956) * sin(radians(relative_bearing)))) * 3956
+        cross_track_distance = abs(asin(max(-1.0, min(1.0, sin(distance / 3956) * sin(radians(relative_bearing)))))) * 3956
 
-        along_track_distance = acos(cos(distance / 3956) / cos(cross_track_distance / 3956)) * 3956
+        along_track_distance = acos(max(-1.0, min(1.0, cos(distance / 3956) / cos(cross_track_distance / 3956)))) * 3956
 
         return along_track_distance
 
+    # Seconds until the aircraft is closest to the flight deck, from its predicted track;
+    # None if it is too slow to time a show against
+    def seconds_to_flight_deck(self):
+        if self.speed < self.config['min_speed_knots']:
+            return None
+        eta = self.predictor.seconds_to_closest_approach(clock.time())
+        if eta is None:
+            # No position report yet, fall back to straight-line distance / speed
+            if not self.geometry_fresh:
+                self.refresh_geometry()
+            eta = self.distance_from_center_miles / self.speed * 3600
+        return eta
+
     def is_moving_towards_flight_deck(self):
-        # Calculate current distance
-        current_distance = self.calculate_distance(self.config['flight_deck_latitude'], self.config['flight_deck_longitude'])
+        return bool(self.current_flags() & MOVING_TOWARDS)
 
+    def calculate_moving_towards_flight_deck(self):
         # Calculate bearing from aircraft to flight deck
         flight_deck_bearing = self.calculate_bearing(self.latitude, self.longitude, self.config['flight_deck_latitude'], self.config['flight_deck_longitude'])
 
@@ -141,63 +235,17 @@ class Aircraft:
 
         return next_distance > current_distance
 
-    def is_landing_from_east(self):
-        if self.is_landing == True:
-            return True
-        elif self.is_east_of_flight_deck() and self.is_on_west_heading() and self.is_descending():
-            self.is_landing = True
-            return True
-        else:
-            return False
-
-    def is_taking_off_from_west(self):
-        if self.is_takeoff == True:
-            return True
-        # west of flight deck, altitude is below 2500, vert_rate > 2000
-        elif self.is_west_of_flight_deck() and self.altitude < 2500 and self.vert_rate > 2000:
-        #elif self.is_west_of_flight_deck() and self.is_on_west_heading() and self.is_ascending():
-            self.is_takeoff = True
-            return True
-        else:
-            return False
-
     def is_in_monitoring_radius(self):
-        return self.distance_from_center_miles <= self.config['aircraft_monitoring_radius']
+        return bool(self.current_flags() & IN_MONITORING_RADIUS)
 
     def is_in_trigger_radius(self):
-        return self.distance_from_center_miles <= self.config['aircraft_trigger_radius']
+        return bool(self.current_flags() & IN_TRIGGER_RADIUS)
 
     def is_speed_within_range(self):
-        return self.config['min_speed_knots'] <= self.speed <= self.config['max_speed_knots']
+        return bool(self.current_flags() & SPEED_IN_RANGE)
 
     def is_altitude_within_range(self):
-        return self.config['min_altitude_feet'] <= self.altitude <= self.config['max_altitude_feet']
-
-    def is_east_of_flight_deck(self):
-        return self.latitude < self.config['flight_deck_latitude']
-
-    # function to determine if plane is travelling within 10 degrees of self.config['aircraft_landing_runway']
-    def is_on_west_heading(self):
-        return abs(self.track - self.config['aircraft_landing_runway']*10) <= self.config['allowed_heading_deviation']
-
-    # function to determine if plane is travelling within 10 degrees of self.config['aircraft_landing_runway']
-    def is_on_east_heading(self):
-        return abs(self.track - self.config['aircraft_takeoff_runway']*10) <= self.config['allowed_heading_deviation']
-
-    def is_west_of_flight_deck(self):
-        return self.longitude > self.config['flight_deck_longitude']
-
-    def is_descending(self):
-        if len(self.altitude_history) < 3:
-            return False
-        avg_vert_cal_rate = sum(self.altitude_history) / len(self.altitude_history)
-        return avg_vert_cal_rate <= self.config['min_landing_descent_rate']
-
-    def is_ascending(self):
-        if len(self.altitude_history) < 2:
-            return False
-        avg_vert_cal_rate = sum(self.altitude_history) / len(self.altitude_history)
-        return avg_vert_cal_rate >= self.config['min_takeoff_climb_rate']
+        return bool(self.current_flags() & ALTITUDE_IN_RANGE)
 
     @staticmethod
     def get_shuffled_mp3_list(tower, config):
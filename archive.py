@@ -0,0 +1,358 @@
+import bisect
+import os
+import struct
+import sys
+import zlib
+import json
+from array import array
+
+# Compact, append-only archive of tar1090 snapshots.
+#
+# Only the fields Aircraft consumes are kept. Snapshots are grouped into chunks of
+# roughly `chunk_seconds`; each chunk is stored column by column (one column per
+# field across every aircraft record in the chunk), numeric columns are
+# delta-encoded per aircraft and the whole chunk is zlib compressed. Chunks only
+# reference state inside themselves, so any chunk can be decoded on its own.
+#
+# File layout:
+#   MAGIC, version
+#   chunk*: CHUNK_HEADER(start_ts, end_ts, n_frames, payload_len) + zlib(payload)
+#
+# A sidecar "<archive>.idx" holds one INDEX_ENTRY(start_ts, end_ts, offset) per
+# chunk so readers can seek to any second without touching the chunk data. It is
+# rebuilt from the chunk headers when missing or out of date.
+
+MAGIC = b'FDAR'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sH')
+CHUNK_HEADER = struct.Struct('<ddII')
+INDEX_ENTRY = struct.Struct('<ddQ')
+PAYLOAD_HEADER = struct.Struct('<III')
+
+STRING_FIELDS = ('hex', 'flight', 'category')
+# Numeric fields and the factor used to store them as integers
+NUMERIC_FIELDS = (
+    ('track', 100),
+    ('alt_baro', 1),
+    ('gs', 10),
+    ('lat', 1000000),
+    ('lon', 1000000),
+    ('baro_rate', 1),
+)
+FIELDS = STRING_FIELDS + tuple(name for name, _ in NUMERIC_FIELDS)
+
+# Presence bits, one per field, plus a flag for alt_baro == "ground"
+FIELD_BITS = {name: 1 << idx for idx, name in enumerate(FIELDS)}
+GROUND_BIT = 1 << len(FIELDS)
+
+
+def _to_bytes(values):
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode, data, offset, count):
+    values = array(typecode)
+    end = offset + values.itemsize * count
+    values.frombytes(data[offset:end])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, end
+
+
+def _encode_number(value, scale):
+    try:
+        return int(round(float(value) * scale))
+    except (ValueError, TypeError):
+        return None
+
+
+def encode_chunk(frames):
+    """Encode a list of (timestamp, aircraft_list) into a chunk payload."""
+    strings = {}
+    frame_deltas = array('q')
+    frame_counts = array('I')
+    columns = {name: array('i') for name in ('mask',) + FIELDS}
+    previous = {}  # hex -> last numeric values seen in this chunk
+
+    def string_id(value):
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    last_ms = int(round(frames[0][0] * 1000))
+    for timestamp, aircraft_list in frames:
+        ms = int(round(timestamp * 1000))
+        frame_deltas.append(ms - last_ms)
+        last_ms = ms
+        count = 0
+        for data in aircraft_list:
+            hex_id = data.get('hex')
+            if hex_id is None:
+                continue
+            count += 1
+            mask = FIELD_BITS['hex']
+            for name in STRING_FIELDS:
+                value = data.get(name)
+                if name != 'hex' and value is not None:
+                    mask |= FIELD_BITS[name]
+                columns[name].append(string_id(value if value is not None else ''))
+
+            last = previous.get(hex_id)
+            if last is None:
+                last = previous[hex_id] = [0] * len(NUMERIC_FIELDS)
+            for idx, (name, scale) in enumerate(NUMERIC_FIELDS):
+                value = data.get(name)
+                if name == 'alt_baro' and value == 'ground':
+                    mask |= GROUND_BIT
+                    value = None
+                number = _encode_number(value, scale) if value is not None else None
+                if number is None:
+                    columns[name].append(0)  # Repeat the previous value
+                    continue
+                mask |= FIELD_BITS[name]
+                columns[name].append(number - last[idx])
+                last[idx] = number
+            columns['mask'].append(mask)
+        frame_counts.append(count)
+
+    string_blob = '\0'.join(strings).encode('utf-8')
+    parts = [
+        PAYLOAD_HEADER.pack(len(frames), len(columns['mask']), len(string_blob)),
+        _to_bytes(frame_deltas),
+        _to_bytes(frame_counts),
+        string_blob,
+    ]
+    parts.extend(_to_bytes(columns[name]) for name in ('mask',) + FIELDS)
+    return zlib.compress(b''.join(parts), 6)
+
+
+def decode_chunk(start_ts, payload):
+    """Decode a chunk payload back into a list of (timestamp, aircraft_list)."""
+    data = zlib.decompress(payload)
+    n_frames, n_records, strings_len = PAYLOAD_HEADER.unpack_from(data, 0)
+    offset = PAYLOAD_HEADER.size
+    frame_deltas, offset = _from_bytes('q', data, offset, n_frames)
+    frame_counts, offset = _from_bytes('I', data, offset, n_frames)
+    strings = data[offset:offset + strings_len].decode('utf-8').split('\0')
+    offset += strings_len
+    columns = {}
+    for name in ('mask',) + FIELDS:
+        columns[name], offset = _from_bytes('i', data, offset, n_records)
+
+    masks = columns['mask']
+    string_columns = [(name, columns[name], FIELD_BITS[name]) for name in STRING_FIELDS]
+    numeric_columns = [(idx, name, scale, columns[name], FIELD_BITS[name])
+                       for idx, (name, scale) in enumerate(NUMERIC_FIELDS)]
+    previous = {}
+    frames = []
+    record = 0
+    ms = int(round(start_ts * 1000))
+    for delta, count in zip(frame_deltas, frame_counts):
+        ms += delta
+        aircraft_list = []
+        for _ in range(count):
+            mask = masks[record]
+            aircraft = {}
+            for name, column, bit in string_columns:
+                if mask & bit:
+                    aircraft[name] = strings[column[record]]
+            hex_id = aircraft['hex']
+            last = previous.get(hex_id)
+            if last is None:
+                last = previous[hex_id] = [0] * len(NUMERIC_FIELDS)
+            for idx, name, scale, column, bit in numeric_columns:
+                if mask & bit:
+                    last[idx] += column[record]
+                    aircraft[name] = last[idx] if scale == 1 else last[idx] / scale
+            if mask & GROUND_BIT:
+                aircraft['alt_baro'] = 'ground'
+            aircraft_list.append(aircraft)
+            record += 1
+        frames.append((ms / 1000, aircraft_list))
+    return frames
+
+
+def scan_chunks(file):
+    """Walk the chunk headers of an open archive; returns (index, valid_end_offset)."""
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    header = file.read(FILE_HEADER.size)
+    if len(header) < FILE_HEADER.size:
+        return [], 0
+    magic, version = FILE_HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a flightdeck archive (version {VERSION})")
+
+    index = []
+    offset = FILE_HEADER.size
+    while offset + CHUNK_HEADER.size <= size:
+        file.seek(offset)
+        start_ts, end_ts, n_frames, payload_len = CHUNK_HEADER.unpack(file.read(CHUNK_HEADER.size))
+        end = offset + CHUNK_HEADER.size + payload_len
+        if end > size:
+            break  # Truncated chunk from an interrupted write
+        index.append((start_ts, end_ts, offset))
+        offset = end
+    return index, offset
+
+
+class ArchiveWriter:
+    def __init__(self, path, chunk_seconds=60):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.chunk_seconds = chunk_seconds
+        self.frames = []
+
+        if os.path.exists(path):
+            self.file = open(path, 'r+b')
+            index, valid_end = scan_chunks(self.file)
+            self.file.truncate(valid_end)
+            self.file.seek(valid_end)
+            if valid_end == 0:
+                self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+            self.write_index(index)
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+            self.write_index([])
+        self.file.flush()
+
+    def write_index(self, index):
+        with open(self.index_path, 'wb') as file:
+            for entry in index:
+                file.write(INDEX_ENTRY.pack(*entry))
+
+    def append(self, timestamp, aircraft_list):
+        if self.frames and timestamp - self.frames[0][0] >= self.chunk_seconds:
+            self.flush()
+        self.frames.append((timestamp, aircraft_list))
+
+    def flush(self):
+        if not self.frames:
+            return
+        start_ts, end_ts = self.frames[0][0], self.frames[-1][0]
+        payload = encode_chunk(self.frames)
+        offset = self.file.tell()
+        self.file.write(CHUNK_HEADER.pack(start_ts, end_ts, len(self.frames), len(payload)))
+        self.file.write(payload)
+        self.file.flush()
+        with open(self.index_path, 'ab') as file:
+            file.write(INDEX_ENTRY.pack(start_ts, end_ts, offset))
+        self.frames = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArchiveReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.index = self.load_index(path + '.idx')
+        self.chunk_ends = [end_ts for _, end_ts, _ in self.index]
+
+    def load_index(self, index_path):
+        self.file.seek(0, os.SEEK_END)
+        size = self.file.tell()
+        index = []
+        try:
+            with open(index_path, 'rb') as file:
+                data = file.read()
+            index = [entry for entry in INDEX_ENTRY.iter_unpack(data[:len(data) - len(data) % INDEX_ENTRY.size])]
+        except OSError:
+            pass
+
+        # Trust the sidecar only if it accounts for the whole archive
+        if index:
+            self.file.seek(index[-1][2])
+            header = self.file.read(CHUNK_HEADER.size)
+            if len(header) == CHUNK_HEADER.size:
+                payload_len = CHUNK_HEADER.unpack(header)[3]
+                if index[-1][2] + CHUNK_HEADER.size + payload_len == size:
+                    return index
+        return scan_chunks(self.file)[0]
+
+    @property
+    def start_time(self):
+        return self.index[0][0] if self.index else None
+
+    @property
+    def end_time(self):
+        return self.index[-1][1] if self.index else None
+
+    def read_chunk(self, position):
+        start_ts, _, offset = self.index[position]
+        self.file.seek(offset)
+        payload_len = CHUNK_HEADER.unpack(self.file.read(CHUNK_HEADER.size))[3]
+        return decode_chunk(start_ts, self.file.read(payload_len))
+
+    # Yield (timestamp, aircraft_list) for every snapshot between start and end
+    def frames(self, start=None, end=None):
+        position = 0 if start is None else bisect.bisect_left(self.chunk_ends, start)
+        while position < len(self.index):
+            if end is not None and self.index[position][0] > end:
+                return
+            for timestamp, aircraft_list in self.read_chunk(position):
+                if start is not None and timestamp < start:
+                    continue
+                if end is not None and timestamp > end:
+                    return
+                yield timestamp, aircraft_list
+            position += 1
+
+    # Return the snapshot that was current at the given second
+    def snapshot_at(self, timestamp):
+        position = bisect.bisect_left(self.chunk_ends, timestamp)
+        if position >= len(self.index):
+            position = len(self.index) - 1
+        current = None
+        for frame in self.read_chunk(position):
+            if frame[0] > timestamp:
+                break
+            current = frame
+        return current
+
+    def close(self):
+        self.file.close()
+
+
+def convert_snapshots(snapshot_dir, archive_path, chunk_seconds=60):
+    files = sorted(f for f in os.listdir(snapshot_dir) if f.endswith('.json') and f[:-5].isdigit())
+    with ArchiveWriter(archive_path, chunk_seconds) as writer:
+        for filename in files:
+            with open(os.path.join(snapshot_dir, filename), 'r') as file:
+                data = json.load(file)
+            writer.append(data.get('now', int(filename[:-5])), data.get('aircraft', []))
+    return len(files)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Convert or inspect flightdeck snapshot archives')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert = subparsers.add_parser('convert', help='Convert a save_json.py directory into an archive')
+    convert.add_argument('snapshot_dir')
+    convert.add_argument('archive')
+    convert.add_argument('--chunk-seconds', type=int, default=60)
+    info = subparsers.add_parser('info', help='Show the time range and size of an archive')
+    info.add_argument('archive')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        count = convert_snapshots(args.snapshot_dir, args.archive, args.chunk_seconds)
+        print(f"Wrote {count} snapshots to {args.archive} ({os.path.getsize(args.archive)} bytes)")
+    else:
+        reader = ArchiveReader(args.archive)
+        print(f"{len(reader.index)} chunks, {reader.start_time} - {reader.end_time}, "
+              f"{os.path.getsize(args.archive)} bytes")
@@ -0,0 +1,165 @@
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# pygame and mutagen are imported where they are used: both are slow to import on a Pi,
+# and with a current duration index mutagen isn't needed at all
+
+INDEX_FILE = '.durations.json'
+
+
+class AudioAssetError(ValueError):
+    pass
+
+
+class AudioAssets:
+    """
+    The MP3s named in audio_effects and button_b_effect, checked and measured
+    when the config loads.
+
+    Durations come from an index file in mp3_folder keyed on each file's mtime
+    and size, so mutagen only reads headers for clips that changed. In music
+    mode clip bytes are kept in an LRU capped at audio_cache_mb and handed to
+    the mixer from memory, so a trigger never waits on the SD card. In channel
+    mode the clips are instead decoded straight from disk into pygame Sounds
+    once the mixer is up, kept in an LRU capped at sound_cache_mb; the bytes
+    aren't cached as well, so each clip is held in memory once.
+    """
+
+    def __init__(self, config, logger):
+        self.logger = logger
+        self.folder = config.get('mp3_folder') or '.'
+        self.cache_limit = int(config.get('audio_cache_mb', 32) * 1024 * 1024)
+        self.cache = OrderedDict()  # name -> bytes, least recently used first
+        self.cache_bytes = 0
+        self.mode = config.get('audio_mode', 'music')
+        if self.mode not in ('music', 'channel'):
+            raise AudioAssetError(f"audio_mode must be 'music' or 'channel', got {self.mode!r}")
+        self.mixer_buffer = int(config.get('mixer_buffer', 8192))
+        self.sound_limit = int(config.get('sound_cache_mb', 128) * 1024 * 1024)
+        self.sounds = OrderedDict()  # name -> (pygame.mixer.Sound, decoded bytes)
+        self.sound_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # Shared by the scheduler and RF threads
+
+        self.names = []
+        for section in ('audio_effects', 'button_b_effect'):
+            for name in config.get(section) or {}:
+                if name not in self.names:
+                    self.names.append(name)
+
+        missing = [name for name in self.names if not os.path.isfile(self.path(name))]
+        if missing:
+            raise AudioAssetError(f"Missing from {self.folder}: {', '.join(missing)}")
+
+        self.durations = self.load_durations()
+        if self.mode == 'music':
+            for name in self.names:
+                self.load(name)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def load_durations(self):
+        index_path = self.path(INDEX_FILE)
+        try:
+            with open(index_path) as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            index = {}
+
+        durations = {}
+        changed = False
+        for name in self.names:
+            stat = os.stat(self.path(name))
+            entry = index.get(name)
+            if not entry or entry.get('mtime') != stat.st_mtime or entry.get('size') != stat.st_size:
+                from mutagen import MutagenError
+                from mutagen.mp3 import MP3
+                try:
+                    length = MP3(self.path(name)).info.length
+                except (OSError, MutagenError) as e:
+                    raise AudioAssetError(f"Unable to read {name}: {e}") from None
+                entry = index[name] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'duration': length}
+                changed = True
+            durations[name] = entry['duration']
+
+        if changed:
+            try:
+                with open(index_path + '.tmp', 'w') as file:
+                    json.dump(index, file, indent=1)
+                os.replace(index_path + '.tmp', index_path)
+            except OSError as e:
+                self.logger.warn(f"Unable to save the audio duration index: {e}")
+        return durations
+
+    def duration(self, name):
+        return self.durations[name]
+
+    def load(self, name):
+        with self.lock:
+            data = self.cache.get(name)
+            if data is not None:
+                self.cache.move_to_end(name)
+                self.hits += 1
+                return data
+            self.misses += 1
+        with open(self.path(name), 'rb') as file:
+            data = file.read()
+        with self.lock:
+            if name not in self.cache:
+                self.cache[name] = data
+                self.cache_bytes += len(data)
+            while self.cache_bytes > self.cache_limit and len(self.cache) > 1:
+                _, evicted = self.cache.popitem(last=False)
+                self.cache_bytes -= len(evicted)
+        return data
+
+    def sound(self, name):
+        import pygame
+        with self.lock:
+            entry = self.sounds.get(name)
+            if entry is not None:
+                self.sounds.move_to_end(name)
+                return entry[0]
+        sound = pygame.mixer.Sound(file=self.path(name))
+        frequency, size, channels = pygame.mixer.get_init()
+        decoded = int(sound.get_length() * frequency * channels * abs(size) // 8)
+        with self.lock:
+            if name not in self.sounds:
+                self.sounds[name] = (sound, decoded)
+                self.sound_bytes += decoded
+            while self.sound_bytes > self.sound_limit and len(self.sounds) > 1:
+                _, (_, evicted) = self.sounds.popitem(last=False)
+                self.sound_bytes -= evicted
+        return sound
+
+    # Decode every clip up front; needs the mixer initialized
+    def preload_sounds(self):
+        import pygame
+        if self.mode != 'channel':
+            return
+        for name in self.names:
+            try:
+                self.sound(name)
+            except pygame.error as e:
+                self.logger.error(f"Unable to decode {name}: {e}")
+
+    # File object for pygame.mixer.music.load(..., 'mp3')
+    def open(self, name):
+        return io.BytesIO(self.load(name))
+
+    def stats(self):
+        with self.lock:
+            return {
+                'clips': len(self.names),
+                'cached': len(self.cache),
+                'cached_mb': self.cache_bytes / (1024 * 1024),
+                'hits': self.hits,
+                'misses': self.misses,
+                'sounds': len(self.sounds),
+                'sounds_mb': self.sound_bytes / (1024 * 1024),
+            }
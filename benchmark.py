@@ -0,0 +1,296 @@
+import argparse
+import datetime
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import clock
+import ingest
+from clock import VirtualClock
+from ingest import AircraftParser
+from replay import ReplayFeed, ReplayFinished
+from tower import Tower
+
+# Benchmark for the Tower ingest -> filter -> decide pipeline.
+#
+# Runs recorded snapshots (a save_json.py directory or an archive) and/or
+# synthetic dense airspace through a headless Tower and writes per-stage latency
+# percentiles, allocation peaks and peak RSS as JSON so runs can be compared
+# across commits:
+#
+#   python benchmark.py --snapshots simulate_data --synthetic 100,1000,10000 -o bench.json
+#   python benchmark.py --synthetic '' --parse simulate_data -o parse.json
+#   python benchmark.py --synthetic '' --geometry 1000,10000 -o geometry.json
+
+TICK_BUDGET_MS = 100  # The monitor loop ticks every 100 ms
+STAGES = ('ingest', 'filter', 'decide', 'total')
+CATEGORIES = ['A1', 'A2', 'A3', 'A3', 'A3', 'A4', 'A5', 'A7', 'B1', 'C1']
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(samples_ms):
+    values = sorted(samples_ms)
+    return {
+        'count': len(values),
+        'mean_ms': sum(values) / len(values) if values else 0.0,
+        'p50_ms': percentile(values, 50),
+        'p90_ms': percentile(values, 90),
+        'p99_ms': percentile(values, 99),
+        'max_ms': values[-1] if values else 0.0,
+    }
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_tower(config_file, virtual_clock):
+    clock.set_clock(virtual_clock)
+    # Every Tower adds its syslog handler to the shared TowerLogger; drop the previous scenario's
+    logger = logging.getLogger('TowerLogger')
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+    tower = Tower(config_file, hardware=False)
+    tower.logger.setLevel(logging.ERROR)
+    # Exercise the decision logic without ever starting a show
+    for site in tower.sites:
+        site.config['always_light_runway'] = False
+        site.config['chatter_per_hour'] = 1e-9
+        site.last_chatter_time = clock.time()
+        site.load_mp3_files()
+    return tower
+
+
+class SyntheticAirspace:
+    """Aircraft flying straight lines through a disc around the flight deck."""
+
+    def __init__(self, config, count, seed=1):
+        self.rng = random.Random(seed)
+        self.center_lat = config['flight_deck_latitude']
+        self.center_lon = config['flight_deck_longitude']
+        self.radius_miles = config['aircraft_monitoring_radius'] * 2
+        self.aircraft = [self.spawn(idx) for idx in range(count)]
+
+    def spawn(self, idx):
+        rng = self.rng
+        distance = self.radius_miles * math.sqrt(rng.random())
+        angle = rng.uniform(0, 2 * math.pi)
+        lat = self.center_lat + distance * math.cos(angle) / 69.0
+        lon = self.center_lon + distance * math.sin(angle) / (69.0 * math.cos(math.radians(self.center_lat)))
+        return {
+            'hex': f"{idx:06x}",
+            'flight': f"SYN{idx:<5}",
+            'category': rng.choice(CATEGORIES),
+            'track': round(rng.uniform(0, 360), 2),
+            'alt_baro': rng.randint(300, 40000),
+            'gs': round(rng.uniform(60, 480), 1),
+            'lat': round(lat, 6),
+            'lon': round(lon, 6),
+            'baro_rate': rng.randint(-2000, 2000),
+        }
+
+    def tick(self, seconds):
+        snapshot = []
+        for data in self.aircraft:
+            miles = data['gs'] * seconds / 3600
+            track = math.radians(data['track'])
+            data['lat'] = round(data['lat'] + miles * math.cos(track) / 69.0, 6)
+            data['lon'] = round(data['lon'] + miles * math.sin(track) / (69.0 * math.cos(math.radians(data['lat']))), 6)
+            snapshot.append(dict(data))
+        return snapshot
+
+
+def run_ticks(name, tower, frames, ticks, trace_allocations):
+    samples = {stage: [] for stage in STAGES}
+    alloc_peaks = {stage: 0 for stage in STAGES[:-1]}
+    counts = {'input': [], 'tracked': [], 'nearby': []}
+    gc_before = sum(stat['collections'] for stat in gc.get_stats())
+
+    for _ in range(ticks):
+        aircraft_list = next(frames, None)
+        if aircraft_list is None:
+            break
+
+        stage_times = {}
+        start = time.perf_counter()
+        for stage in STAGES[:-1]:
+            if trace_allocations:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            stage_start = time.perf_counter()
+            if stage == 'ingest':
+                tower.ingest_aircraft_data(aircraft_list)
+            elif stage == 'filter':
+                nearby_aircraft = tower.filter_aircraft()
+            elif nearby_aircraft:
+                tower.process_closest_aircraft(None)
+            stage_times[stage] = time.perf_counter() - stage_start
+            if trace_allocations:
+                alloc_peaks[stage] = max(alloc_peaks[stage], tracemalloc.get_traced_memory()[1] - base)
+        stage_times['total'] = time.perf_counter() - start
+
+        for stage, seconds in stage_times.items():
+            samples[stage].append(seconds * 1000)
+        counts['input'].append(len(aircraft_list))
+        counts['tracked'].append(sum(len(site.unique_aircraft) for site in tower.sites))
+        counts['nearby'].append(len(nearby_aircraft))
+
+    totals = samples['total']
+    result = {
+        'scenario': name,
+        'ticks': len(totals),
+        'stages': {stage: summarize(samples[stage]) for stage in STAGES},
+        'over_budget_ticks': sum(1 for value in totals if value > TICK_BUDGET_MS),
+        'aircraft': {key: {'mean': sum(values) / len(values) if values else 0, 'max': max(values, default=0)}
+                     for key, values in counts.items()},
+        'gc_collections': sum(stat['collections'] for stat in gc.get_stats()) - gc_before,
+        'fleet': tower.unique_aircraft.eviction_stats(),
+        'geofence': tower.geofence.stats(),
+        'peak_rss_kb': peak_rss_kb(),
+    }
+    if trace_allocations:
+        result['alloc_peak_kb'] = {stage: peak / 1024 for stage, peak in alloc_peaks.items()}
+    return result
+
+
+def run_parse(directory, limit):
+    names = sorted(name for name in os.listdir(directory) if name.endswith('.json'))[:limit]
+    payloads = []
+    for name in names:
+        with open(os.path.join(directory, name), 'rb') as file:
+            payloads.append(file.read())
+
+    def full_decode(payload):
+        return json.loads(payload).get('aircraft', [])
+
+    parsers = [('json.loads (full)', full_decode), (f"AircraftParser ({ingest.BACKEND})", AircraftParser().parse)]
+    results = {'files': len(payloads), 'mean_bytes': sum(map(len, payloads)) / len(payloads) if payloads else 0}
+    for name, parse in parsers:
+        samples = []
+        for payload in payloads:
+            start = time.perf_counter()
+            parse(payload)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = summarize(samples)
+    return results
+
+
+def recorded_frames(feed):
+    while True:
+        try:
+            aircraft_list = feed.fetch()
+        except ReplayFinished:
+            return
+        yield aircraft_list
+        clock.sleep(1)
+
+
+def synthetic_frames(airspace, virtual_clock, tick_seconds):
+    while True:
+        virtual_clock.sleep(tick_seconds)
+        yield airspace.tick(tick_seconds)
+
+
+# The fleet geometry pass alone: FleetStore.update_geometry (NumPy) against the
+# per-aircraft scalar fallback over the same tracked aircraft
+def run_geometry(config_file, count, ticks):
+    virtual_clock = VirtualClock(time.time(), speed=None)
+    tower = make_tower(config_file, virtual_clock)
+    airspace = SyntheticAirspace(tower.config, count)
+    tower.ingest_aircraft_data(airspace.tick(TICK_BUDGET_MS / 1000))
+    fleet = tower.unique_aircraft
+
+    def scalar():
+        for aircraft in fleet.values():
+            aircraft.refresh_geometry()
+
+    results = {'tracked': len(fleet)}
+    for name, geometry_pass in (('vectorized', fleet.update_geometry), ('scalar', scalar)):
+        samples = []
+        for _ in range(ticks):
+            start = time.perf_counter()
+            geometry_pass()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = summarize(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Tower ingest -> filter -> decide pipeline')
+    parser.add_argument('--config', default='config.yml')
+    parser.add_argument('--snapshots', metavar='PATH', help="save_json.py directory or archive to replay")
+    parser.add_argument('--synthetic', default='100,1000,10000',
+                        help="Comma separated aircraft-per-tick counts for synthetic airspace ('' to skip)")
+    parser.add_argument('--ticks', type=int, default=600, help="Ticks per scenario (Default: 600)")
+    parser.add_argument('--parse', metavar='DIR', help="Also time aircraft.json decoding over a save_json.py directory")
+    parser.add_argument('--geometry', metavar='COUNTS',
+                        help="Also time the fleet geometry pass, vectorized vs scalar, at these synthetic aircraft counts")
+    parser.add_argument('--tracemalloc', action='store_true', help="Record per-stage allocation peaks (slower)")
+    parser.add_argument('-o', '--output', help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    results = []
+    if args.snapshots:
+        feed = ReplayFeed(args.snapshots, speed=None)
+        tower = make_tower(args.config, feed.clock)
+        results.append(run_ticks(f"recorded:{args.snapshots}", tower, recorded_frames(feed), args.ticks, args.tracemalloc))
+
+    for count in [int(value) for value in args.synthetic.split(',') if value.strip()]:
+        virtual_clock = VirtualClock(time.time(), speed=None)
+        tower = make_tower(args.config, virtual_clock)
+        airspace = SyntheticAirspace(tower.config, count)
+        frames = synthetic_frames(airspace, virtual_clock, TICK_BUDGET_MS / 1000)
+        results.append(run_ticks(f"synthetic:{count}", tower, frames, args.ticks, args.tracemalloc))
+
+    report = {
+        'commit': git_commit(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'tick_budget_ms': TICK_BUDGET_MS,
+        'tracemalloc': args.tracemalloc,
+        'results': results,
+    }
+    if args.parse:
+        report['parse'] = run_parse(args.parse, args.ticks)
+    if args.geometry:
+        report['geometry'] = {count: run_geometry(args.config, int(count), args.ticks)
+                              for count in args.geometry.split(',') if count.strip()}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+from collections import deque
+from math import atan2, cos, degrees, radians, sin
+
+APPROACH = 'approach'
+DEPARTURE = 'departure'
+OVERFLIGHT = 'overflight'
+
+DEPARTURE_MAX_ALTITUDE = 2500  # Feet; above this a climbing aircraft is already on its way
+
+
+def along_runway(config, runway, latitude, longitude):
+    """
+    How far past the flight deck a position is in the direction of runway
+    (in degrees of latitude, flat-earth): negative before the deck, positive
+    after it.
+    """
+    heading = radians(runway * 10)
+    north = latitude - config['flight_deck_latitude']
+    east = (longitude - config['flight_deck_longitude']) * cos(radians(config['flight_deck_latitude']))
+    return north * cos(heading) + east * sin(heading)
+
+
+class PhaseClassifier:
+    """
+    Incremental landing/takeoff classifier for one aircraft.
+
+    Keeps a window of the last phase_window (timestamp, altitude, vert_rate,
+    track) samples with running sums, so the mean vertical rate and the mean
+    track (as a circular mean) cost O(1) per update. A sample matches approach
+    when the aircraft is short of the deck on the landing runway heading and
+    descending at least min_landing_descent_rate on average, and departure
+    when it is past the deck along the takeoff runway heading, below
+    DEPARTURE_MAX_ALTITUDE and climbing at least min_takeoff_climb_rate on
+    average. "Short of" and "past" are measured along each runway's heading
+    from the configured deck, so any site and runway layout works. The phase changes only after
+    phase_enter_samples matching samples in a row, and falls back to overflight
+    after phase_exit_samples that don't match, or when the aircraft goes
+    quiet for longer than MAX_GAP.
+    """
+
+    __slots__ = ('samples', 'vert_rate_sum', 'track_sin_sum', 'track_cos_sum',
+                 'phase', 'candidate', 'candidate_count', 'miss_count')
+
+    MAX_GAP = 60  # Seconds without a sample before the window starts over
+
+    def __init__(self):
+        self.samples = deque()
+        self.vert_rate_sum = 0.0
+        self.track_sin_sum = 0.0
+        self.track_cos_sum = 0.0
+        self.phase = OVERFLIGHT
+        self.candidate = None
+        self.candidate_count = 0
+        self.miss_count = 0
+
+    def reset(self):
+        self.samples.clear()
+        self.vert_rate_sum = self.track_sin_sum = self.track_cos_sum = 0.0
+        self.phase = OVERFLIGHT
+        self.candidate = None
+        self.candidate_count = self.miss_count = 0
+
+    def update(self, config, timestamp, latitude, longitude, altitude, vert_rate, track):
+        samples = self.samples
+        if samples and timestamp - samples[-1][0] > self.MAX_GAP:
+            self.reset()
+
+        heading = radians(track)
+        sample = (timestamp, altitude, vert_rate, sin(heading), cos(heading))
+        samples.append(sample)
+        self.vert_rate_sum += vert_rate
+        self.track_sin_sum += sample[3]
+        self.track_cos_sum += sample[4]
+        while len(samples) > config.get('phase_window', 5):
+            _, _, old_rate, old_sin, old_cos = samples.popleft()
+            self.vert_rate_sum -= old_rate
+            self.track_sin_sum -= old_sin
+            self.track_cos_sum -= old_cos
+
+        self.transition(config, self.match(config, latitude, longitude, altitude))
+        return self.phase
+
+    def mean_vert_rate(self):
+        return self.vert_rate_sum / len(self.samples) if self.samples else 0.0
+
+    def mean_track(self):
+        return (degrees(atan2(self.track_sin_sum, self.track_cos_sum)) + 360) % 360
+
+    def on_heading(self, config, runway):
+        difference = abs(self.mean_track() - runway * 10) % 360
+        return min(difference, 360 - difference) <= config['allowed_heading_deviation']
+
+    # Which phase this sample looks like, or OVERFLIGHT
+    def match(self, config, latitude, longitude, altitude):
+        if len(self.samples) < config.get('phase_min_samples', 3):
+            return OVERFLIGHT
+        vert_rate = self.mean_vert_rate()
+        if (vert_rate <= config['min_landing_descent_rate'] and self.on_heading(config, config['aircraft_landing_runway'])
+                and along_runway(config, config['aircraft_landing_runway'], latitude, longitude) < 0):
+            return APPROACH
+        if (altitude < DEPARTURE_MAX_ALTITUDE and vert_rate >= config['min_takeoff_climb_rate']
+                and along_runway(config, config['aircraft_takeoff_runway'], latitude, longitude) > 0):
+            return DEPARTURE
+        return OVERFLIGHT
+
+    def transition(self, config, matched):
+        if matched == self.phase:
+            self.candidate = None
+            self.candidate_count = self.miss_count = 0
+            return
+        if self.phase != OVERFLIGHT:
+            # Leaving a phase takes phase_exit_samples misses in a row
+            self.miss_count += 1
+            if self.miss_count < config.get('phase_exit_samples', 3):
+                return
+            self.phase = OVERFLIGHT
+            self.miss_count = 0
+            if matched == OVERFLIGHT:
+                return
+        if matched != self.candidate:
+            self.candidate = matched
+            self.candidate_count = 0
+        self.candidate_count += 1
+        if self.candidate_count >= config.get('phase_enter_samples', 2):
+            self.phase = matched
+            self.candidate = None
+            self.candidate_count = 0
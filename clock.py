@@ -0,0 +1,93 @@
+import threading
+import time as _time
+
+# Every module that needs "now" (tower, aircraft, radio) goes through this module
+# instead of calling time.time()/time.sleep() directly, so a replay can swap in a
+# virtual clock and the whole program follows it.
+
+
+class WallClock:
+    speed = 1.0
+
+    def time(self):
+        return _time.time()
+
+    def sleep(self, seconds):
+        _time.sleep(seconds)
+
+    # Convert a span of clock seconds into real seconds
+    def to_real(self, seconds):
+        return seconds
+
+
+class VirtualClock:
+    """
+    Clock used when replaying recorded snapshots.
+
+    speed=1.0 runs in real time, speed=N runs N times faster and speed=None runs
+    as fast as possible: time only moves when the thread that created the clock
+    (the one polling the replay) sleeps or advances it to the next snapshot.
+    Other threads sleeping at speed=None (a show on the scheduler thread) wait
+    for that thread to bring virtual time up to their deadline, so they can't
+    move the monitor loop's clock and make it skip frames.
+    """
+
+    def __init__(self, start_time, speed=1.0):
+        self.speed = speed
+        self._origin = start_time
+        self._anchor = _time.monotonic()
+        self._driver = threading.get_ident()
+        self._moved = threading.Condition()
+
+    def time(self):
+        if self.speed is None:
+            return self._origin
+        return self._origin + (_time.monotonic() - self._anchor) * self.speed
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        if self.speed is None:
+            with self._moved:
+                deadline = self._origin + seconds
+                if threading.get_ident() == self._driver:
+                    self._origin = deadline
+                    self._moved.notify_all()
+                else:
+                    self._moved.wait_for(lambda: self._origin >= deadline)
+        else:
+            _time.sleep(seconds / self.speed)
+
+    def to_real(self, seconds):
+        if self.speed is None:
+            return 0
+        return seconds / self.speed
+
+    # Jump forward to a point in virtual time; never moves the clock backwards
+    def advance_to(self, timestamp):
+        with self._moved:
+            if timestamp <= self.time():
+                return
+            self._origin = timestamp
+            self._anchor = _time.monotonic()
+            self._moved.notify_all()
+
+
+_clock = WallClock()
+
+
+def set_clock(new_clock):
+    global _clock
+    _clock = new_clock
+
+
+def get_clock():
+    return _clock
+
+
+def time():
+    return _clock.time()
+
+
+def sleep(seconds):
+    _clock.sleep(seconds)
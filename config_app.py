@@ -1,8 +1,11 @@
-from flask import Flask, render_template, redirect, url_for, flash, Response
+from flask import Flask, render_template, redirect, url_for, flash, Response, jsonify
 from ruamel.yaml import YAML
 from forms import ConfigForm
+from log_tailer import LogTailer
 import os
-import subprocess
+import queue
+import re
+import urllib.request
 
 app = Flask(__name__)
 app.config.from_object('config.Config')
@@ -11,35 +14,110 @@ yaml = YAML()
 
 config_file_path = 'config.yml'
 
+# Every /streamlogs client shares one journalctl; the last 500 lines are replayed to new clients
+log_tailer = LogTailer(['/usr/bin/sudo', '/usr/bin/journalctl', '-f', '-o', 'cat'], history=500)
+KEEPALIVE_SECONDS = 15  # Also how soon a closed tab is noticed and unsubscribed
+
 def load_config():
     with open(config_file_path, 'r') as file:
         return yaml.load(file)
 
+# Write a temp file and rename it over config.yml, so FlightDeck's config watcher never reads half a file
 def save_config(data):
-    with open(config_file_path, 'w') as file:
+    temp_path = f"{config_file_path}.tmp"
+    with open(temp_path, 'w') as file:
         yaml.dump(data, file)
-
-def restart_flightdeck_service():
-    try:
-        subprocess.run(["/usr/bin/sudo", "/usr/bin/systemctl", "restart", "flightdeck"], check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error restarting FlightDeck service: {e}")
-        flash('Failed to restart FlightDeck service', 'error')
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, config_file_path)
 
 @app.route('/streamlogs')
 def streamlogs():
     def generate():
-        process = subprocess.Popen(['/usr/bin/sudo', '/usr/bin/journalctl', '-f', '-n', '0', '-o', 'cat'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        while True:
-            line = process.stdout.readline()
-            if line:
-                yield f'data: {line.decode("utf-8")}\n\n'
-            else:
-                yield 'event: end\n\n'
-                break
+        subscriber = log_tailer.subscribe()
+        try:
+            while True:
+                try:
+                    line = subscriber.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'  # Fails once the client is gone, which ends the generator
+                    continue
+                dropped = subscriber.take_dropped()
+                if dropped:
+                    yield f'event: dropped\ndata: {dropped}\n\n'
+                yield f'data: {line}\n\n'
+        finally:
+            log_tailer.unsubscribe(subscriber)
 
     return Response(generate(), mimetype='text/event-stream')
 
+# One Prometheus text sample: name{labels} value
+METRIC_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+METRIC_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+def read_tower_metrics():
+    config_data = load_config()
+    url = f"http://{config_data.get('metrics_host', '127.0.0.1')}:{config_data.get('metrics_port', 9109)}/metrics"
+    with urllib.request.urlopen(url, timeout=2) as response:
+        return response.read().decode('utf-8')
+
+# Fold Prometheus text into rows for the metrics page: histograms become count/mean/p50/p95
+def summarize_metrics(text):
+    helps = {}
+    values = []
+    histograms = {}
+    for line in text.splitlines():
+        if line.startswith('# HELP '):
+            name, _, help_text = line[7:].partition(' ')
+            helps[name] = help_text
+            continue
+        match = METRIC_LINE.match(line)
+        if not match:
+            continue
+        name, label_text, value = match.groups()
+        labels = dict(METRIC_LABEL.findall(label_text or ''))
+        for suffix in ('_bucket', '_sum', '_count'):
+            family = name[:-len(suffix)]
+            if name.endswith(suffix) and family in helps:
+                bound = labels.pop('le', None)
+                key = (family, tuple(sorted(labels.items())))
+                histogram = histograms.setdefault(key, {'buckets': [], 'sum': 0.0, 'count': 0})
+                if suffix == '_bucket':
+                    histogram['buckets'].append((float(bound), float(value)))
+                else:
+                    histogram[suffix[1:]] = float(value)
+                break
+        else:
+            values.append({'name': name, 'labels': labels, 'value': float(value), 'help': helps.get(name, '')})
+
+    def quantile(buckets, count, q):
+        for bound, cumulative in buckets:
+            if cumulative >= count * q:
+                return bound if bound != float('inf') else None  # Past the largest bucket
+        return None
+
+    for (family, labels), histogram in sorted(histograms.items()):
+        count = histogram['count']
+        buckets = sorted(histogram['buckets'])
+        values.append({
+            'name': family, 'labels': dict(labels), 'help': helps.get(family, ''), 'count': count,
+            'mean': histogram['sum'] / count if count else None,
+            'p50': quantile(buckets, count, 0.5) if count else None,
+            'p95': quantile(buckets, count, 0.95) if count else None,
+        })
+    return values
+
+@app.route('/metrics')
+def metrics():
+    return render_template('metrics.html')
+
+@app.route('/metrics_data')
+def metrics_data():
+    try:
+        return jsonify(metrics=summarize_metrics(read_tower_metrics()))
+    except (OSError, ValueError) as e:
+        return jsonify(error=f"FlightDeck metrics unavailable: {e}"), 503
+
 @app.route('/viewlogs')
 def viewlogs():
     return render_template('viewlogs.html')
@@ -76,8 +154,7 @@ def settings():
         config_data['ignore_high_performance_aircraft'] = form.ignore_high_performance_aircraft.data
 
         save_config(config_data)
-        flash('Configuration updated successfully!', 'success')
-        restart_flightdeck_service()
+        flash('Configuration saved; FlightDeck picks it up within a few seconds.', 'success')
         return redirect(url_for('settings'))
 
     form.chatter_per_hour.data = config_data['chatter_per_hour']
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from effects import compile_effects
+
+# yaml is imported by parse_config, so a start that hits the cache never loads it.
+# The cache is only trusted for the code that wrote it: parse_config decides what a
+# parsed config looks like, and this file's mtime and size are part of its key.
+CACHE_CODE = (__file__,)
+
+# Settings that are only read at startup; a reload keeps their old values and says so
+RESTART_KEYS = ('ingest', 'tar1090_url', 'tar1090_timeout', 'sbs_host', 'sbs_port', 'esp_port',
+                'audio_mode', 'mixer_buffer', 'metrics_host', 'metrics_port', 'profile_dir', 'profile_interval_ms')
+# Settings AudioAssets is built from; when none of them change a reload reuses the loaded clips
+AUDIO_KEYS = ('mp3_folder', 'audio_effects', 'button_b_effect', 'audio_cache_mb', 'sound_cache_mb')
+
+# A config that parsed and validated, with everything derived from it
+CompiledConfig = namedtuple('CompiledConfig', ('config', 'timelines', 'audio'))
+
+
+class ConfigError(ValueError):
+    pass
+
+
+def parse_config(raw, path):
+    import yaml
+    # libyaml's loader is ~10x faster on config.yml's embedded effect JSON; fall back when PyYAML was built without it
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    try:
+        config = yaml.load(raw, Loader=loader)
+    except yaml.YAMLError as e:
+        raise ConfigError(f"Error parsing {path}: {e}") from None
+    if not isinstance(config, dict):
+        raise ConfigError(f"{path} does not hold a mapping of settings")
+    return config
+
+
+def cache_path(path):
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.cache")
+
+
+def code_signature():
+    signature = []
+    for source in CACHE_CODE:
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def load_compiled_config(path):
+    """
+    (config, timelines, cached) for the config file at path.
+
+    Parsing the YAML is most of what a restart spends on config, and the
+    file rarely changes between restarts, so the parsed settings are saved
+    next to it as JSON (.config.yml.cache) under the SHA-1 of the file's
+    bytes and the signature of the code that reads it. A matching cache
+    skips the YAML; the effects are compiled from it every time, which is a
+    few milliseconds and means nothing but plain data is ever read back.
+    Anything else about the cache (missing, stale, unreadable) just means
+    parsing again, and a config JSON can't hold exactly is never cached.
+    Raises ConfigError or EffectError for a file that can't be used.
+    """
+    try:
+        with open(path, 'rb') as file:
+            raw = file.read()
+    except OSError as e:
+        raise ConfigError(f"Unable to read {path}: {e}") from None
+    digest = hashlib.sha1(raw).hexdigest()
+    code = code_signature()
+    key = [digest, [list(entry) for entry in code]] if code is not None else None
+
+    try:
+        with open(cache_path(path), encoding='utf-8') as file:
+            cached = json.load(file)
+        if key is not None and cached['key'] == key and isinstance(cached['config'], dict):
+            return cached['config'], compile_effects(cached['config']), True
+    except (OSError, ValueError, KeyError, TypeError):
+        pass  # No usable cache
+
+    config = parse_config(raw, path)
+    timelines = compile_effects(config)
+    try:
+        text = json.dumps({'key': key, 'config': config})
+        # YAML can hold what JSON can't (int keys, dates); those configs are parsed every time
+        if key is not None and json.loads(text)['config'] == config:
+            with open(cache_path(path) + '.tmp', 'w', encoding='utf-8') as file:
+                file.write(text)
+            os.replace(cache_path(path) + '.tmp', cache_path(path))
+    except (OSError, TypeError, ValueError):
+        pass  # Read-only install or an uncacheable config; parse every time
+    return config, timelines, False
+
+
+def changed_keys(old, new):
+    return sorted(key for key in set(old) | set(new) if old.get(key) != new.get(key))
+
+
+class ConfigWatcher:
+    """
+    Watches the config file and prepares new versions for Tower off the loop.
+
+    A daemon thread checks the file's mtime and size every INTERVAL seconds.
+    When they change it loads and compiles the file (load_compiled_config)
+    and hands the config and effect timelines to compile, which validates the
+    rest and builds what else it needs (audio assets). A ValueError from any
+    of that keeps the running config. A good result waits in take() for the monitor loop,
+    which swaps it in between ticks.
+    """
+
+    INTERVAL = 1.0
+
+    def __init__(self, path, logger, compile):
+        self.path = path
+        self.logger = logger
+        self.compile = compile
+        self.signature = self.file_signature()
+        self.pending = None
+        self.lock = threading.Lock()
+        self.reloads = 0
+        self.failures = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.watch_loop, name='config-watcher', daemon=True)
+        self.thread.start()
+
+    def file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def watch_loop(self):
+        while True:
+            time.sleep(self.INTERVAL)
+            signature = self.file_signature()
+            if signature is None or signature == self.signature:
+                continue
+            self.signature = signature
+            try:
+                config, timelines, _ = load_compiled_config(self.path)
+                compiled = self.compile(config, timelines)
+            except ValueError as e:
+                self.failures += 1
+                self.logger.error(f"Not reloading {self.path}: {e}")
+                continue
+            with self.lock:
+                self.pending = compiled
+
+    # The newest compiled config not yet applied, or None
+    def take(self):
+        with self.lock:
+            compiled, self.pending = self.pending, None
+        if compiled is not None:
+            self.reloads += 1
+        return compiled
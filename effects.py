@@ -0,0 +1,143 @@
+import json
+import time
+from collections import namedtuple
+
+# WLED effects compiled once when the config is loaded.
+#
+# Each wled_command in config.yml is validated as JSON and minified to compact
+# bytes (the pretty, field-heavy strings in the YAML cost real time at 115200
+# baud), and each effect list becomes an immutable timeline with cumulative
+# start offsets. A malformed command fails at startup instead of mid-show.
+
+EffectStep = namedtuple('EffectStep', [
+    'offset',    # Seconds from the start of the effect
+    'duration',  # Seconds to hold this step; 0 holds until the audio finishes
+    'payload',   # Minified JSON bytes ready for the serial link
+])
+
+EffectTimeline = namedtuple('EffectTimeline', [
+    'name',
+    'steps',     # Tuple of EffectStep
+    'duration',  # Sum of the fixed step durations
+])
+
+StepTiming = namedtuple('StepTiming', [
+    'index',
+    'lateness',  # Seconds the step went out after its deadline
+    'skipped',   # True if the step's whole window had already passed
+])
+
+# Presets used outside the configured effects
+IDLE_CANDLES = b'{"ps":1}'
+RUNWAY_LIGHTS = b'{"ps":2}'
+
+
+class EffectError(ValueError):
+    pass
+
+
+def compile_command(command, where):
+    if isinstance(command, (dict, list)):
+        parsed = command
+    else:
+        try:
+            parsed = json.loads(command)
+        except (TypeError, ValueError) as exc:
+            raise EffectError(f"{where}: wled_command is not valid JSON ({exc}): {command!r}") from None
+    return json.dumps(parsed, separators=(',', ':')).encode()
+
+
+def compile_timeline(name, entries, where):
+    if not isinstance(entries, list) or not entries:
+        raise EffectError(f"{where}: expected a non-empty list of wled_command entries")
+    steps = []
+    offset = 0.0
+    for idx, entry in enumerate(entries):
+        step_where = f"{where}[{idx}]"
+        if not isinstance(entry, dict) or 'wled_command' not in entry:
+            raise EffectError(f"{step_where}: missing wled_command")
+        duration = entry.get('effect_duration', 0)
+        if isinstance(duration, bool) or not isinstance(duration, (int, float)) or duration < 0:
+            raise EffectError(f"{step_where}: effect_duration must be a number >= 0, got {duration!r}")
+        steps.append(EffectStep(offset, float(duration), compile_command(entry['wled_command'], step_where)))
+        offset += duration
+    return EffectTimeline(name, tuple(steps), offset)
+
+
+def compile_effects(config):
+    """Compile audio_effects, button_b_effect and idle_effects from the config."""
+    compiled = {'audio_effects': {}, 'button_b_effect': {}, 'idle_effects': []}
+    for section in ('audio_effects', 'button_b_effect'):
+        for mp3_file, entries in (config.get(section) or {}).items():
+            compiled[section][mp3_file] = compile_timeline(mp3_file, entries, f"{section}.{mp3_file}")
+    for idx, entry in enumerate(config.get('idle_effects') or []):
+        where = f"idle_effects[{idx}]"
+        if not isinstance(entry, dict) or 'wled_command' not in entry:
+            raise EffectError(f"{where}: missing wled_command")
+        compiled['idle_effects'].append(compile_command(entry['wled_command'], where))
+    return compiled
+
+
+# Longest single sleep while waiting on a step; keeps cancellation responsive
+POLL_SECONDS = 0.05
+
+
+def play_timeline(timeline, send, position, audio_busy, cancelled=None):
+    """
+    Play a compiled timeline against the audio's playback position.
+
+    position() returns seconds since the audio started (the mixer's reported
+    position, or a time.monotonic() anchor), and each step is due when it
+    reaches the step's offset, so sleep overshoot and serial cost don't
+    accumulate from step to step. A step that is late is sent straight away;
+    one whose whole window has already passed is skipped. A hold step waits
+    for audio_busy() to go False and the steps after it are timed on the
+    monotonic clock from that moment. Stops early once cancelled() is True.
+    Returns a StepTiming per step played.
+    """
+    timings = []
+    segment_offset = 0.0
+    elapsed = position
+
+    def wait_until(target):
+        while True:
+            if cancelled is not None and cancelled():
+                return False
+            remaining = target - elapsed()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, POLL_SECONDS))
+
+    for index, step in enumerate(timeline.steps):
+        deadline = step.offset - segment_offset
+        if not wait_until(deadline):
+            return timings
+        lateness = max(elapsed() - deadline, 0.0)
+        skipped = step.duration > 0 and lateness >= step.duration
+        if not skipped:
+            send(step.payload)
+        timings.append(StepTiming(index, lateness, skipped))
+
+        if step.duration == 0:
+            while audio_busy():
+                if cancelled is not None and cancelled():
+                    return timings
+                time.sleep(POLL_SECONDS)
+            segment_start = time.monotonic()
+            segment_offset = step.offset
+            elapsed = lambda: time.monotonic() - segment_start
+
+    # Let the timeline run out its last step before handing back
+    wait_until(timeline.duration - segment_offset)
+    return timings
+
+
+def summarize_timings(timings):
+    lateness = sorted(timing.lateness for timing in timings if not timing.skipped)
+    return {
+        'steps': len(timings),
+        'skipped': sum(1 for timing in timings if timing.skipped),
+        'late_mean_ms': sum(lateness) / len(lateness) * 1000 if lateness else 0.0,
+        'late_p95_ms': lateness[min(len(lateness) - 1, int(len(lateness) * 0.95))] * 1000 if lateness else 0.0,
+        'late_max_ms': lateness[-1] * 1000 if lateness else 0.0,
+    }
@@ -0,0 +1,159 @@
+import heapq
+import itertools
+import numpy as np
+from aircraft import Aircraft
+from geometry import compute_fleet_geometry
+
+
+class FleetStore:
+    """
+    Tracked aircraft keyed by ICAO hex.
+
+    Each aircraft is a compact __slots__ Aircraft record that owns a slot number.
+    The kinematic fields the geometry pass needs (lat, lon, track, speed,
+    altitude) are mirrored into fixed-width NumPy columns indexed by that slot, so
+    compute_fleet_geometry runs straight over the store without building arrays
+    every tick. Slots freed by remove() are handed out again before the columns
+    grow.
+
+    Behaves like the dict Tower used to keep (`in`, `[]`, `values()`, `len()`).
+
+    Stale aircraft are evicted through a min-heap keyed on last_seen. Each
+    aircraft has exactly one heap entry; when it surfaces and the aircraft has
+    been seen since, it is pushed back with its new last_seen instead of being
+    updated on every tick, so eviction costs amortized O(log n) per aircraft per
+    TTL period rather than a scan of everything ever seen.
+
+    An evicted aircraft that already had its show leaves its trigger time
+    behind in `triggered`; if the same hex is heard again it comes back with
+    has_triggered_audio set instead of as a new aircraft that triggers again.
+    Those entries are dropped after TRIGGER_MEMORY seconds.
+    """
+
+    COLUMNS = ('latitude', 'longitude', 'track', 'speed', 'altitude')
+    TRIGGER_MEMORY = 24 * 3600  # Seconds an evicted aircraft's show is remembered
+
+    def __init__(self, config, logger, radio, capacity=64):
+        self.config = config
+        self.logger = logger
+        self.radio = radio  # Shared by every aircraft; a Radio holds no per-aircraft state
+        self.by_hex = {}
+        self.free_slots = []
+        self.high_water = 0  # Slots below this have been handed out at least once
+        self.capacity = capacity
+        self.expiry_heap = []  # (last_seen, sequence, hex, aircraft)
+        self.expiry_sequence = itertools.count()
+        self.evicted_total = 0
+        self.expiry_rearmed = 0
+        self.triggered = {}  # hex -> has_triggered_audio of evicted aircraft, oldest first
+        for name in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=np.float64))
+
+    def __contains__(self, hex_id):
+        return hex_id in self.by_hex
+
+    def __getitem__(self, hex_id):
+        return self.by_hex[hex_id]
+
+    def __len__(self):
+        return len(self.by_hex)
+
+    def __iter__(self):
+        return iter(self.by_hex)
+
+    def values(self):
+        return self.by_hex.values()
+
+    def items(self):
+        return self.by_hex.items()
+
+    def get(self, hex_id, default=None):
+        return self.by_hex.get(hex_id, default)
+
+    def add(self, hex_id, data):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            if self.high_water == self.capacity:
+                self.grow()
+            slot = self.high_water
+            self.high_water += 1
+        aircraft = Aircraft(self, slot, data)
+        triggered = self.triggered.pop(hex_id, None)
+        if triggered is not None:
+            aircraft.has_triggered_audio = triggered  # Back in range after its show, don't play it again
+        self.by_hex[hex_id] = aircraft
+        heapq.heappush(self.expiry_heap, (aircraft.last_seen, next(self.expiry_sequence), hex_id, aircraft))
+        return aircraft
+
+    def remove(self, hex_id):
+        aircraft = self.by_hex.pop(hex_id, None)
+        if aircraft is not None:
+            self.free_slots.append(aircraft.slot)
+        return aircraft
+
+    # Drop aircraft not seen for `ttl` seconds; returns how many were evicted
+    def evict_expired(self, now, ttl):
+        evicted = 0
+        heap = self.expiry_heap
+        while heap and heap[0][0] + ttl < now:
+            _, _, hex_id, aircraft = heapq.heappop(heap)
+            if self.by_hex.get(hex_id) is not aircraft:
+                continue  # Already removed some other way
+            if aircraft.last_seen + ttl >= now:
+                # Seen since this entry was pushed, check again when it could next expire
+                heapq.heappush(heap, (aircraft.last_seen, next(self.expiry_sequence), hex_id, aircraft))
+                self.expiry_rearmed += 1
+                continue
+            if aircraft.has_triggered_audio:
+                self.triggered[hex_id] = aircraft.has_triggered_audio
+            self.remove(hex_id)
+            evicted += 1
+        self.evicted_total += evicted
+        # Eviction order is close enough to trigger order to stop at the first recent show
+        while self.triggered:
+            hex_id = next(iter(self.triggered))
+            if self.triggered[hex_id] + self.TRIGGER_MEMORY >= now:
+                break
+            del self.triggered[hex_id]
+        return evicted
+
+    def eviction_stats(self):
+        return {
+            'tracked': len(self.by_hex),
+            'evicted_total': self.evicted_total,
+            'expiry_rearmed': self.expiry_rearmed,
+            'remembered_shows': len(self.triggered),
+            'free_slots': len(self.free_slots),
+        }
+
+    def grow(self):
+        self.capacity *= 2
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(self.capacity, dtype=np.float64)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def write_kinematics(self, slot, latitude, longitude, track, speed, altitude):
+        self.latitude[slot] = latitude
+        self.longitude[slot] = longitude
+        self.track[slot] = track
+        self.speed[slot] = speed
+        self.altitude[slot] = altitude
+
+    # Run the distance/bearing/trigger math for every tracked aircraft in one NumPy pass
+    def update_geometry(self):
+        if not self.by_hex:
+            return
+        used = self.high_water
+        geometry = compute_fleet_geometry(
+            self.latitude[:used], self.longitude[:used], self.track[:used],
+            self.speed[:used], self.altitude[:used], self.config,
+        )
+        distance = geometry.distance.tolist()
+        along_track = geometry.along_track.tolist()
+        flags = geometry.flags.tolist()
+        for aircraft in self.by_hex.values():
+            slot = aircraft.slot
+            aircraft.apply_geometry(distance[slot], along_track[slot], flags[slot])
@@ -0,0 +1,74 @@
+from math import cos, degrees, radians
+from geometry import EARTH_RADIUS_MILES
+
+# Categories Tower never shows: B* (gliders, balloons, UAVs...) and C* (ground vehicles/obstacles)
+IGNORED_CATEGORY_PREFIXES = ('B', 'C')
+
+
+class Geofence:
+    """
+    Lat/lon bounding box around the flight deck, checked against the raw
+    tar1090 dicts before any Aircraft is built or updated.
+
+    The box is sized from the larger of the monitoring and trigger radii, with
+    the longitude half-width scaled by cos(lat) at the box's poleward edge so it
+    always contains the whole circle. Anything outside it would be filtered by
+    valid_aircraft anyway; rejecting it here costs two subtractions instead of
+    an Aircraft update and a trip through the geometry pass.
+
+    The box only decides which new aircraft start being tracked. Updates for an
+    aircraft already in the FleetStore always go through, so one that flies out
+    of the box keeps a fresh position (and drops out of the nearby list through
+    valid_aircraft) instead of freezing at its last in-range report.
+    """
+
+    MARGIN = 1.05  # Slack so aircraft right on the radius are still tracked
+
+    def __init__(self, config):
+        self.latitude = config['flight_deck_latitude']
+        self.longitude = config['flight_deck_longitude']
+        radius = max(config['aircraft_monitoring_radius'], config['aircraft_trigger_radius']) * self.MARGIN
+        self.lat_span = degrees(radius / EARTH_RADIUS_MILES)
+        edge_latitude = min(abs(self.latitude) + self.lat_span, 89.0)
+        self.lon_span = min(self.lat_span / cos(radians(edge_latitude)), 180.0)
+        self.admitted = 0
+        self.rejected_category = 0
+        self.rejected_position = 0
+        self.rejected_range = 0
+
+    # tracked: the aircraft is already in the FleetStore
+    def admits(self, data, tracked=False):
+        category = data.get('category')
+        if category and category.startswith(IGNORED_CATEGORY_PREFIXES):
+            self.rejected_category += 1
+            return False
+
+        latitude = data.get('lat')
+        longitude = data.get('lon')
+        if latitude is None or longitude is None:
+            # No position this poll; a tracked aircraft keeps its last one and stays fresh
+            if tracked:
+                self.admitted += 1
+                return True
+            self.rejected_position += 1
+            return False
+
+        try:
+            dlat = abs(latitude - self.latitude)
+            dlon = abs((longitude - self.longitude + 540) % 360 - 180)
+        except TypeError:
+            self.rejected_position += 1
+            return False
+        if not tracked and (dlat > self.lat_span or dlon > self.lon_span):
+            self.rejected_range += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def stats(self):
+        return {
+            'admitted': self.admitted,
+            'rejected_category': self.rejected_category,
+            'rejected_position': self.rejected_position,
+            'rejected_range': self.rejected_range,
+        }
@@ -0,0 +1,97 @@
+from collections import namedtuple
+import numpy as np
+
+EARTH_RADIUS_MILES = 3956
+
+# Bits of the per-aircraft predicate flags, computed once per geometry pass
+IN_MONITORING_RADIUS = 1
+IN_TRIGGER_RADIUS = 2
+SPEED_IN_RANGE = 4
+ALTITUDE_IN_RANGE = 8
+MOVING_TOWARDS = 16
+# Everything process_closest_aircraft needs before it will start a show
+TRIGGER_READY = IN_TRIGGER_RADIUS | SPEED_IN_RANGE | ALTITUDE_IN_RANGE | MOVING_TOWARDS
+
+# Per-aircraft results of one batched geometry pass; every field is an array
+# with one entry per aircraft, in the order the inputs were given.
+FleetGeometry = namedtuple('FleetGeometry', [
+    'distance',             # Great-circle distance from the flight deck (miles)
+    'bearing',              # Bearing from the flight deck to the aircraft (degrees)
+    'relative_bearing',     # Aircraft track relative to that bearing (degrees)
+    'cross_track',          # Distance the track passes abeam the flight deck (miles)
+    'along_track',          # Distance along the track to that point (miles)
+    'in_monitoring_radius',
+    'in_trigger_radius',
+    'speed_in_range',
+    'altitude_in_range',
+    'moving_towards',       # Track within 90 degrees of the bearing back to the deck
+    'flags',                # The five predicates above packed into one int per aircraft
+])
+
+
+def compute_fleet_geometry(latitude, longitude, track, speed, altitude, config):
+    """
+    Vectorized equivalent of Aircraft.calculate_distance, calculate_closest_distance,
+    calculate_bearing, is_moving_towards_flight_deck and the range predicates,
+    computed for the whole fleet in one pass over NumPy arrays.
+    """
+    lat1 = np.radians(config['flight_deck_latitude'])
+    lon1 = np.radians(config['flight_deck_longitude'])
+    lat2 = np.radians(np.asarray(latitude, dtype=np.float64))
+    lon2 = np.radians(np.asarray(longitude, dtype=np.float64))
+    track = np.asarray(track, dtype=np.float64)
+    speed = np.asarray(speed, dtype=np.float64)
+    altitude = np.asarray(altitude, dtype=np.float64)
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    cos_lat1 = np.cos(lat1)
+    sin_lat1 = np.sin(lat1)
+    cos_lat2 = np.cos(lat2)
+    sin_lat2 = np.sin(lat2)
+    sin_dlon = np.sin(dlon)
+    cos_dlon = np.cos(dlon)
+
+    # Haversine distance from the flight deck
+    a = np.sin(dlat / 2) ** 2 + cos_lat1 * cos_lat2 * np.sin(dlon / 2) ** 2
+    angular_distance = 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    distance = angular_distance * EARTH_RADIUS_MILES
+
+    # Bearing from the flight deck out to the aircraft
+    bearing = np.degrees(np.arctan2(sin_dlon * cos_lat2, cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * cos_dlon))
+    bearing = (bearing + 360) % 360
+
+    # Cross-track / along-track distance of the aircraft's track relative to the deck
+    relative_bearing = (track - bearing + 360) % 360
+    cross_angle = np.abs(np.arcsin(np.clip(np.sin(angular_distance) * np.sin(np.radians(relative_bearing)), -1.0, 1.0)))
+    cross_track = cross_angle * EARTH_RADIUS_MILES
+    along_track = np.arccos(np.clip(np.cos(angular_distance) / np.cos(cross_angle), -1.0, 1.0)) * EARTH_RADIUS_MILES
+
+    # Bearing from the aircraft back to the flight deck, and whether the track points at it
+    deck_bearing = np.degrees(np.arctan2(-sin_dlon * cos_lat1, cos_lat2 * sin_lat1 - sin_lat2 * cos_lat1 * cos_dlon))
+    deck_bearing = (deck_bearing + 360) % 360
+    track_to_bearing_diff = np.abs((track - deck_bearing + 360) % 360)
+    track_to_bearing_diff = np.where(track_to_bearing_diff > 180, 360 - track_to_bearing_diff, track_to_bearing_diff)
+
+    in_monitoring_radius = distance <= config['aircraft_monitoring_radius']
+    in_trigger_radius = distance <= config['aircraft_trigger_radius']
+    speed_in_range = (config['min_speed_knots'] <= speed) & (speed <= config['max_speed_knots'])
+    altitude_in_range = (config['min_altitude_feet'] <= altitude) & (altitude <= config['max_altitude_feet'])
+    moving_towards = track_to_bearing_diff <= 90
+    flags = (in_monitoring_radius * IN_MONITORING_RADIUS + in_trigger_radius * IN_TRIGGER_RADIUS
+             + speed_in_range * SPEED_IN_RANGE + altitude_in_range * ALTITUDE_IN_RANGE
+             + moving_towards * MOVING_TOWARDS)
+
+    return FleetGeometry(
+        distance=distance,
+        bearing=bearing,
+        relative_bearing=relative_bearing,
+        cross_track=cross_track,
+        along_track=along_track,
+        in_monitoring_radius=in_monitoring_radius,
+        in_trigger_radius=in_trigger_radius,
+        speed_in_range=speed_in_range,
+        altitude_in_range=altitude_in_range,
+        moving_towards=moving_towards,
+        flags=flags,
+    )
@@ -0,0 +1,80 @@
+import time
+from metrics import PARSE_SECONDS
+
+try:
+    import orjson
+    _loads = orjson.loads
+    BACKEND = 'orjson'
+except ImportError:  # Optional; the standard library parser is about 2.5x slower
+    import json
+    _loads = json.loads
+    BACKEND = 'json'
+
+# The only keys Aircraft reads out of a readsb aircraft entry
+FIELDS = ('hex', 'flight', 'category', 'track', 'alt_baro', 'gs', 'lat', 'lon', 'baro_rate')
+
+
+class ParseError(ValueError):
+    pass
+
+
+class AircraftParser:
+    """
+    Decodes tar1090/readsb aircraft.json into small dicts holding just FIELDS.
+
+    The response body is read into a bytearray that is kept and grown between
+    polls, decoded with orjson when it is installed, and each aircraft entry is
+    projected into a pooled dict, so the dozens of unused readsb fields (nac_p,
+    sil, mlat, rssi...) don't outlive the decode. The returned list and its
+    dicts are reused by the next parse; callers must be done with them by then.
+    """
+
+    INITIAL_BUFFER = 64 * 1024
+
+    def __init__(self):
+        self.buffer = bytearray(self.INITIAL_BUFFER)
+        self.records = []
+        self.pool = []
+        self.now = None  # readsb's timestamp for the last payload parsed
+
+    # Read an HTTP response body (requests, stream=True) into the reusable buffer
+    def read_response(self, response):
+        raw = response.raw
+        raw.decode_content = True
+        length = 0
+        while True:
+            if length == len(self.buffer):
+                self.buffer.extend(bytes(len(self.buffer)))
+            count = raw.readinto(memoryview(self.buffer)[length:])
+            if not count:
+                break
+            length += count
+        return self.parse(memoryview(self.buffer)[:length])
+
+    def parse(self, payload):
+        start = time.perf_counter()
+        if BACKEND == 'json' and isinstance(payload, memoryview):
+            payload = payload.tobytes()
+        try:
+            data = _loads(payload)
+        except ValueError as e:
+            raise ParseError(f"Invalid aircraft.json: {e}") from None
+        if not isinstance(data, dict):
+            raise ParseError("Invalid aircraft.json: expected an object")
+
+        self.now = data.get('now')
+        entries = data.get('aircraft') or []
+        pool = self.pool
+        while len(pool) < len(entries):
+            pool.append({})
+        records = self.records
+        records.clear()
+        for entry, record in zip(entries, pool):
+            record.clear()
+            for field in FIELDS:
+                value = entry.get(field)
+                if value is not None:
+                    record[field] = value
+            records.append(record)
+        PARSE_SECONDS.observe(time.perf_counter() - start)
+        return records
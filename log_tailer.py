@@ -0,0 +1,145 @@
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+
+
+class Subscriber:
+    """
+    One /streamlogs client: a bounded queue of lines waiting to be sent.
+
+    A client that can't keep up loses its oldest lines rather than holding up
+    the tailer or the other clients; dropped counts them so the stream can
+    say so.
+    """
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, line):
+        while True:
+            try:
+                self.queue.put_nowait(line)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout):
+        return self.queue.get(timeout=timeout)
+
+    # Lines dropped since the last call
+    def take_dropped(self):
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class LogTailer:
+    """
+    One journalctl -f for every log viewer.
+
+    The first subscriber starts a reader thread that runs the command with
+    `-n history`, keeps the last `history` lines in a ring buffer and hands
+    each new line to every subscriber's queue. New subscribers get the ring
+    buffer as backfill, taken under the same lock that publishes lines, so
+    nothing is missed or repeated between the backfill and the live stream.
+    If the command exits it is restarted with exponential backoff and `-n 0`,
+    so the history isn't sent again (lines logged while it was down are
+    skipped). When the last subscriber leaves the command is stopped; the next
+    one starts it afresh from the last `history` lines.
+    """
+
+    MIN_BACKOFF = 1
+    MAX_BACKOFF = 30
+
+    def __init__(self, command, history=500, client_queue=1000):
+        self.command = command
+        self.history = history
+        self.lines = deque(maxlen=history)
+        self.client_queue = client_queue
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.stop_event = None  # Set while a reader thread is wanted
+        self.process = None
+
+    def subscribe(self):
+        subscriber = Subscriber(self.client_queue)
+        with self.lock:
+            if self.stop_event is None:
+                self.lines.clear()  # The new reader starts with the latest history itself
+                self.stop_event = threading.Event()
+                threading.Thread(target=self.read_loop, args=(self.stop_event,), name='log-tailer', daemon=True).start()
+            for line in self.lines:
+                subscriber.put(line)
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+            if self.subscribers or self.stop_event is None:
+                return
+            self.stop_event.set()
+            self.stop_event = None
+            process, self.process = self.process, None
+        if process is not None:
+            stop_process(process)
+
+    # Lines from a reader that has been stopped are dropped
+    def publish(self, line, stop_event):
+        with self.lock:
+            if stop_event.is_set():
+                return
+            self.lines.append(line)
+            for subscriber in self.subscribers:
+                subscriber.put(line)
+
+    def read_loop(self, stop_event):
+        backoff = self.MIN_BACKOFF
+        backlog = self.history  # Only the first run sends history
+        while not stop_event.is_set():
+            started = time.monotonic()
+            command = self.command + ['-n', str(backlog)]
+            try:
+                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            except OSError as e:
+                self.publish(f"Unable to run {self.command[-1] if self.command else 'log command'}: {e}", stop_event)
+            else:
+                backlog = 0
+                with self.lock:
+                    stopped = stop_event.is_set()
+                    if not stopped:
+                        self.process = process
+                if stopped:
+                    stop_process(process)
+                    return
+                for raw in process.stdout:
+                    self.publish(raw.decode('utf-8', 'replace').rstrip('\n'), stop_event)
+                process.wait()
+            if time.monotonic() - started > self.MAX_BACKOFF:
+                backoff = self.MIN_BACKOFF  # It ran for a while; restart promptly
+            if stop_event.wait(backoff):
+                return
+            backoff = min(backoff * 2, self.MAX_BACKOFF)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'running': self.process is not None and self.process.poll() is None,
+                'subscribers': len(self.subscribers),
+                'buffered': len(self.lines),
+            }
+
+
+def stop_process(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
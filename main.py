@@ -1,20 +1,56 @@
-import curses
+import time
+STARTED = time.perf_counter()  # Before the imports, so the startup report counts them
+import argparse
+import clock
 from tower import Tower
+from profiling import StartupTimer, install_signal_handlers
+from replay import ReplayFeed
 import logging
 import os
 import sys
 
-def main(stdscr):
+def parse_args():
+    parser = argparse.ArgumentParser(description='The Flight Deck aircraft monitor')
+    parser.add_argument('--replay', metavar='PATH',
+                        help="Replay a save_json.py snapshot directory or archive instead of polling tar1090")
+    parser.add_argument('--speed', default='1',
+                        help="Replay speed multiplier, or 'max' to replay as fast as possible (Default: 1)")
+    parser.add_argument('--start', type=int, default=None,
+                        help="Epoch second to start the replay from")
+    parser.add_argument('--profile', action='store_true',
+                        help="Run the sampling profiler from startup (SIGUSR1/SIGUSR2 start and stop it any time)")
+    parser.add_argument('--no-hardware', action='store_true',
+                        help="Run without the RF remote and WLED devices (implied by --replay)")
+    return parser.parse_args()
+
+def main(stdscr, args, startup):
     try:
-        tower = Tower()
-        tower.monitor_aircraft_with_descent_and_destination(stdscr)
+        data_source = None
+        if args.replay:
+            speed = None if args.speed == 'max' else float(args.speed)
+            data_source = ReplayFeed(args.replay, speed=speed, start=args.start)
+            clock.set_clock(data_source.clock)
+            startup.mark('replay')
+        hardware = not (args.replay or args.no_hardware)
+        tower = Tower(data_source=data_source, hardware=hardware, startup=startup)
+        install_signal_handlers(tower.profiler)
+        if args.profile:
+            tower.profiler.start()
+        try:
+            tower.monitor_aircraft_with_descent_and_destination(stdscr)
+        finally:
+            tower.profiler.stop(wait=True)
     except Exception as e:
         logging.error(f"An error occurred: {e}", exc_info=True)
 
 if __name__ == "__main__":
+    args = parse_args()
+    startup = StartupTimer(STARTED)
+    startup.mark('imports')
     is_tty = os.isatty(sys.stdin.fileno())
 
     if is_tty:
-        curses.wrapper(main)
+        import curses
+        curses.wrapper(main, args, startup)
     else:
-        main(False)
+        main(False, args, startup)
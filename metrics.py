@@ -0,0 +1,197 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds: 1 ms up to 5 s
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Effect lateness and audio start delay care about tens of ms, but a show can be seconds out
+TIMING_BUCKETS = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metric:
+    """
+    One metric family: a value (or histogram) per combination of label values.
+
+    Updates take the family's lock and touch a dict entry, so they are cheap
+    enough for the monitor loop, the serial writer and the show thread to call
+    on every event.
+    """
+
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def label_text(self, key, extra=None):
+        pairs = list(zip(self.label_names, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ''
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines.extend(self.render_value(key, value))
+        return lines
+
+    def render_value(self, key, value):
+        return [f"{self.name}{self.label_text(key)} {format_value(value)}"]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, labels=()):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # Per-bucket (not cumulative) counts, then sum and count
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts = state[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            else:
+                counts[-1] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render_value(self, key, value):
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{self.name}_bucket{self.label_text(key, ('le', format_value(bound)))} {cumulative}")
+        lines.append(f"{self.name}_bucket{self.label_text(key, ('le', '+Inf'))} {count}")
+        lines.append(f"{self.name}_sum{self.label_text(key)} {format_value(total)}")
+        lines.append(f"{self.name}_count{self.label_text(key)} {count}")
+        return lines
+
+    def render(self):
+        with self.lock:
+            items = sorted((key, [list(state[0]), state[1], state[2]]) for key, state in self.values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in items:
+            lines.extend(self.render_value(key, value))
+        return lines
+
+
+def format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+TICK_SECONDS = REGISTRY.register(Histogram(
+    'flightdeck_tick_seconds', 'Monitor loop tick duration, excluding its idle sleep'))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'flightdeck_stage_seconds', 'Monitor loop time per stage: fetch, process, display, decide', labels=('stage',)))
+FETCH_SECONDS = REGISTRY.register(Histogram(
+    'flightdeck_fetch_seconds', 'tar1090 request latency: 200 (new frame), 304, unchanged (200 with the same now) or error',
+    labels=('status',)))
+FETCH_RESULTS = REGISTRY.register(Counter(
+    'flightdeck_fetch_results_total', 'tar1090 polls by result: new_frame, not_modified (304), unchanged (same now) or error',
+    labels=('result',)))
+PARSE_SECONDS = REGISTRY.register(Histogram(
+    'flightdeck_parse_seconds', 'aircraft.json decode time'))
+AIRCRAFT = REGISTRY.register(Gauge(
+    'flightdeck_aircraft', 'Aircraft in the last new frame: input (from the source), tracked and nearby (after filtering)',
+    labels=('stage',)))
+TRIGGER_DECISIONS = REGISTRY.register(Counter(
+    'flightdeck_trigger_decisions_total', 'Decisions on trigger-ready aircraft: show, runway, or held by the chatter budget (each counted once per aircraft)',
+    labels=('site', 'decision')))
+SERIAL_WRITE_SECONDS = REGISTRY.register(Histogram(
+    'flightdeck_serial_write_seconds', 'WLED command latency from enqueue to written', labels=('port',)))
+SERIAL_DROPPED = REGISTRY.register(Counter(
+    'flightdeck_serial_dropped_total', 'WLED commands dropped (queue full, port down or write error)', labels=('port',)))
+EFFECT_LATENESS_SECONDS = REGISTRY.register(Histogram(
+    'flightdeck_effect_lateness_seconds', 'How late effect steps were sent against the audio position',
+    TIMING_BUCKETS, labels=('site',)))
+EFFECT_STEPS_SKIPPED = REGISTRY.register(Counter(
+    'flightdeck_effect_steps_skipped_total', 'Effect steps skipped for being too late', labels=('site',)))
+AUDIO_START_DELAY_SECONDS = REGISTRY.register(Histogram(
+    'flightdeck_audio_start_delay_seconds', 'Show audio start against its scheduled time', TIMING_BUCKETS,
+    labels=('site',)))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the journal
+
+
+# Serve REGISTRY in Prometheus text format on a daemon thread; returns the server
+def start_metrics_server(host, port):
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f"metrics-{port}", daemon=True).start()
+    return server
@@ -0,0 +1,80 @@
+import time
+import pygame
+
+# Mixer channels reserved in channel mode
+SHOW_CHANNEL = 0      # Aircraft shows
+BUTTON_CHANNEL = 1    # Button B
+
+
+class MusicPlayback:
+    """
+    A clip streamed through the single pygame.mixer.music stream.
+
+    position() follows music.get_pos(), carried forward on the monotonic clock
+    once the stream stops reporting (e.g. a timeline that outlasts its clip).
+    """
+
+    def __init__(self, audio):
+        self.audio = audio
+        self.last_position = 0.0
+        self.last_checked = time.monotonic()
+
+    def start(self, name):
+        pygame.mixer.music.load(self.audio.open(name), 'mp3')
+        pygame.mixer.music.set_volume(1.0)
+        pygame.mixer.music.play()
+        self.last_position = 0.0
+        self.last_checked = time.monotonic()
+
+    def position(self):
+        now = time.monotonic()
+        pos = pygame.mixer.music.get_pos()
+        if pos >= 0:
+            self.last_position = pos / 1000
+            self.last_checked = now
+            return self.last_position
+        return self.last_position + (now - self.last_checked)
+
+    def busy(self):
+        return pygame.mixer.music.get_busy()
+
+    def set_volume(self, volume):
+        pygame.mixer.music.set_volume(volume)
+
+    def stop(self):
+        pygame.mixer.music.stop()
+
+
+class ChannelPlayback:
+    """
+    A preloaded Sound on a reserved mixer Channel.
+
+    Channels don't report a play position, so position() runs off a monotonic
+    anchor taken when the Sound starts, pushed back by one mixer buffer of
+    output latency.
+    """
+
+    def __init__(self, audio, channel_id):
+        self.audio = audio
+        self.channel = pygame.mixer.Channel(channel_id)
+        frequency, _, _ = pygame.mixer.get_init()
+        self.latency = audio.mixer_buffer / frequency
+        self.anchor = time.monotonic()
+
+    def start(self, name):
+        sound = self.audio.sound(name)
+        self.channel.set_volume(1.0)
+        self.channel.play(sound)
+        self.anchor = time.monotonic() + self.latency
+
+    def position(self):
+        return time.monotonic() - self.anchor
+
+    def busy(self):
+        return self.channel.get_busy()
+
+    def set_volume(self, volume):
+        self.channel.set_volume(volume)
+
+    def stop(self):
+        self.channel.stop()
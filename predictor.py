@@ -0,0 +1,84 @@
+from math import cos, radians, sin, sqrt
+from geometry import EARTH_RADIUS_MILES
+
+MILES_PER_DEGREE = radians(1) * EARTH_RADIUS_MILES
+
+
+class TrackPredictor:
+    """
+    Alpha-beta filter over one aircraft's reported positions, in a flat
+    east/north frame (miles) centred on the flight deck.
+
+    Each update predicts the position forward from the last one, corrects it
+    and the velocity by the residual, and blends in the reported ground speed
+    and track as a direct velocity measurement. From the smoothed position and
+    velocity it keeps the closest point of approach to the deck: how long until
+    the aircraft gets there and how close it passes. That is what a show
+    should be timed against, rather than straight-line distance / speed, which
+    is only right for aircraft pointed straight at the deck.
+    """
+
+    __slots__ = ('origin_lat', 'origin_lon', 'lon_scale', 'x', 'y', 'vx', 'vy', 'updated_at',
+                 'samples', 'cpa_time', 'cpa_distance')
+
+    ALPHA = 0.5          # Position correction gain
+    BETA = 0.1           # Velocity correction gain (from position residuals)
+    VELOCITY_BLEND = 0.5 # Weight of the reported gs/track in the velocity estimate
+    MAX_GAP = 30         # Seconds without an update before the filter restarts
+
+    def __init__(self, origin_lat, origin_lon):
+        self.origin_lat = origin_lat
+        self.origin_lon = origin_lon
+        self.lon_scale = MILES_PER_DEGREE * cos(radians(origin_lat))
+        self.x = self.y = self.vx = self.vy = 0.0
+        self.updated_at = None
+        self.samples = 0
+        self.cpa_time = None      # Clock time of the closest point of approach
+        self.cpa_distance = None  # Miles from the deck at that point
+
+    def update(self, now, latitude, longitude, speed, track):
+        x = (longitude - self.origin_lon) * self.lon_scale
+        y = (latitude - self.origin_lat) * MILES_PER_DEGREE
+        heading = radians(track)
+        measured_vx = speed / 3600 * sin(heading)  # miles per second
+        measured_vy = speed / 3600 * cos(heading)
+
+        dt = now - self.updated_at if self.updated_at is not None else None
+        if dt is None or dt > self.MAX_GAP or dt < 0:
+            self.x, self.y, self.vx, self.vy = x, y, measured_vx, measured_vy
+            self.samples = 1
+        elif dt > 0:
+            predicted_x = self.x + self.vx * dt
+            predicted_y = self.y + self.vy * dt
+            residual_x = x - predicted_x
+            residual_y = y - predicted_y
+            self.x = predicted_x + self.ALPHA * residual_x
+            self.y = predicted_y + self.ALPHA * residual_y
+            vx = self.vx + self.BETA * residual_x / dt
+            vy = self.vy + self.BETA * residual_y / dt
+            self.vx = vx + self.VELOCITY_BLEND * (measured_vx - vx)
+            self.vy = vy + self.VELOCITY_BLEND * (measured_vy - vy)
+            self.samples += 1
+        else:
+            return  # Same timestamp as the last update; nothing new
+        self.updated_at = now
+        self.update_closest_approach()
+
+    def update_closest_approach(self):
+        speed_squared = self.vx * self.vx + self.vy * self.vy
+        if speed_squared == 0:
+            self.cpa_time = self.updated_at
+            self.cpa_distance = sqrt(self.x * self.x + self.y * self.y)
+            return
+        # Time along the current velocity that minimizes distance to the origin
+        seconds = max(-(self.x * self.vx + self.y * self.vy) / speed_squared, 0.0)
+        cpa_x = self.x + self.vx * seconds
+        cpa_y = self.y + self.vy * seconds
+        self.cpa_time = self.updated_at + seconds
+        self.cpa_distance = sqrt(cpa_x * cpa_x + cpa_y * cpa_y)
+
+    # Seconds from `now` until the closest point of approach (0 once it has passed)
+    def seconds_to_closest_approach(self, now):
+        if self.cpa_time is None:
+            return None
+        return max(self.cpa_time - now, 0.0)
@@ -0,0 +1,145 @@
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from metrics import STAGE_SECONDS
+
+
+class StageTimer:
+    """
+    Times one stage of the monitor loop into flightdeck_stage_seconds:
+
+        with self.fetch_timer:
+            ...
+
+    One instance per stage, reused every tick; entering and leaving costs two
+    perf_counter() calls and a histogram update.
+    """
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        STAGE_SECONDS.observe(time.perf_counter() - self.start, stage=self.name)
+        return False
+
+
+class StartupTimer:
+    """
+    Wall time of each startup phase, from `started` (a perf_counter() taken as
+    early as possible) to the first aircraft poll.
+    """
+
+    def __init__(self, started=None):
+        self.started = self.last = started if started is not None else time.perf_counter()
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        phases = ', '.join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in self.phases)
+        return f"Startup took {(self.last - self.started) * 1000:.0f} ms: {phases}"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that can be switched on and off in a running service.
+
+    While running, a daemon thread wakes every interval and records the Python
+    stack of every other thread (sys._current_frames()), counting identical
+    stacks. Stopping writes them in the folded format flamegraph.pl, speedscope
+    and inferno read, one "thread;outer;...;inner count" line per stack, to
+    profile_dir/flightdeck-<time>.folded. Frames are named by function, file
+    and first line, so samples from anywhere in a function merge.
+    """
+
+    def __init__(self, directory, interval, logger):
+        self.directory = directory
+        self.interval = interval
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = None
+        self.last_path = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return False
+            self.stop_event = threading.Event()
+            self.thread = threading.Thread(target=self.sample_loop, args=(self.stop_event,),
+                                           name='sampling-profiler', daemon=True)
+            self.thread.start()
+        self.logger.warn(f"Sampling profiler started ({self.interval * 1000:.0f} ms interval)")
+        return True
+
+    # Safe to call from a signal handler: the sampler thread writes the file on its way out
+    def stop(self, wait=False):
+        with self.lock:
+            if not self.running:
+                return False
+            self.stop_event.set()
+            thread = self.thread
+        if wait:
+            thread.join()
+        return True
+
+    def toggle(self):
+        if not self.stop():
+            self.start()
+
+    def sample_loop(self, stop_event):
+        stacks = Counter()
+        own_id = threading.get_ident()
+        started = time.time()
+        samples = 0
+        while not stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stacks[';'.join(reversed(stack))] += 1
+            samples += 1
+        self.write(stacks, started, samples)
+
+    def write(self, stacks, started, samples):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, time.strftime('flightdeck-%Y%m%d-%H%M%S.folded', time.localtime(started)))
+            with open(path, 'w') as file:
+                for stack, count in stacks.most_common():
+                    file.write(f"{stack} {count}\n")
+        except OSError as e:
+            self.logger.error(f"Unable to write profile to {self.directory}: {e}")
+            return
+        self.last_path = path
+        self.logger.warn(f"Sampling profiler stopped after {samples} samples ({time.time() - started:.0f} s); wrote {path}")
+
+
+# SIGUSR1 starts the profiler and SIGUSR2 stops it, e.g. `systemctl kill -s USR1 flightdeck`.
+# Must be called from the main thread.
+def install_signal_handlers(profiler):
+    signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.start())
+    signal.signal(signal.SIGUSR2, lambda signum, frame: profiler.stop())
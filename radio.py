@@ -1,149 +1,205 @@
-import glob
-import curses
-import serial
-import os
-import time, datetime
-import pygame
-from mutagen.mp3 import MP3
+import threading
+import time
+import clock
+from effects import IDLE_CANDLES, RUNWAY_LIGHTS, play_timeline, summarize_timings
+from metrics import AUDIO_START_DELAY_SECONDS, EFFECT_LATENESS_SECONDS, EFFECT_STEPS_SKIPPED
+from scheduler import ShowScheduler
+from serial_link import get_serial_link
 
 class Radio:
-    def __init__(self, config, logger):
+    def __init__(self, config, logger, timelines, audio, channel_base=0, name='flightdeck'):
+        self.name = name  # Site name, for metrics labels and the display
         self.config = config
         self.logger = logger
-        self.esp_port = None
-
-    def find_esp_port(self):
-        if self.esp_port is not None:
-            return self.esp_port
-
-        ports = glob.glob('/dev/ttyUSB*')
-        for port in ports:
-            try:
-                with serial.Serial(port) as ser:
-                    if ser.is_open:
-                        self.esp_port = port
-                        return port
-            except (OSError, serial.SerialException):
-                pass
-        return None
+        self.timelines = timelines  # Compiled by effects.compile_effects when the config loads
+        self.audio = audio  # AudioAssets: clip durations and preloaded bytes
+        # Every Radio talking to the same ESP shares one persistent serial writer
+        self.link = get_serial_link(config.get('esp_port', '/dev/ttyUSB*'), logger)
+        # Shows wait for their aircraft and play here, off the monitor loop
+        self.scheduler = ShowScheduler(logger)
+        self.last_show_timing = None  # summarize_timings() of the most recent show
+        # Set up by setup_playback once the mixer is initialized
+        self.show_playback = None
+        self.button_playback = None
+        self.channel_base = channel_base  # Each site's Radio gets its own pair of mixer channels
+        self.show_active = threading.Event()     # An aircraft show is playing
+        self.show_preempted = threading.Event()  # Button B stopped it
+        self.button_active = threading.Event()   # Button B owns the LEDs
+
+    # Config reload: the serial link and mixer channels stay, everything else follows the new config
+    def reconfigure(self, config, timelines, audio):
+        self.config = config
+        self.timelines = timelines
+        if audio is not self.audio:
+            self.audio = audio
+            for playback in (self.show_playback, self.button_playback):
+                if playback is not None:
+                    playback.audio = audio
 
     def send_command(self, command):
-        esp_port = self.find_esp_port()
-        if esp_port:
-            with serial.Serial(esp_port, 115200, timeout=1) as ser:
-                ser.write(command.encode())
+        self.link.send(command)
+
+    # Aircraft shows hold off the LEDs while button B is playing
+    def send_show_command(self, command):
+        if not self.button_active.is_set():
+            self.link.send(command)
+
+    # pygame (and playback, which needs it) is imported on first use, once the mixer is wanted
+    def setup_playback(self):
+        import pygame
+        from playback import BUTTON_CHANNEL, SHOW_CHANNEL, ChannelPlayback, MusicPlayback
+        if self.audio.mode == 'channel':
+            channels = self.channel_base + 2
+            if pygame.mixer.get_num_channels() < channels:
+                pygame.mixer.set_num_channels(channels)
+            pygame.mixer.set_reserved(channels)
+            self.audio.preload_sounds()
+            self.show_playback = ChannelPlayback(self.audio, self.channel_base + SHOW_CHANNEL)
+            self.button_playback = ChannelPlayback(self.audio, self.channel_base + BUTTON_CHANNEL)
+        else:
+            # One stream: button B always replaces whatever is playing
+            self.show_playback = self.button_playback = MusicPlayback(self.audio)
+        self.logger.info(f"Audio playback on {self.audio.mode} (buffer {self.audio.mixer_buffer})")
+
+    def default_idle_effect(self):
+        idle_effects = self.timelines['idle_effects']
+        return idle_effects[1] if len(idle_effects) > 1 else IDLE_CANDLES
 
     def play_button_b(self, idle_effect):
+        import pygame
         self.logger.warn(f"Playing BUTTON B Special Effect")
-        mp3_file = list(self.config.get('button_b_effect').keys())[0]
+        timeline = next(iter(self.timelines['button_b_effect'].values()))
+        mp3_file = timeline.name
+
+        # Stop or duck an aircraft show that is playing; ducking needs its own channel
+        ducked = False
+        if self.show_active.is_set():
+            if self.config.get('button_b_preempt', 'stop') == 'duck' and self.show_playback is not self.button_playback:
+                self.show_playback.set_volume(self.config.get('duck_volume', 0.2))
+                ducked = True
+            else:
+                self.show_preempted.set()
+                self.show_playback.stop()
+        self.button_active.set()
         try:
-            mp3_path = os.path.join(self.config.get('mp3_folder'), mp3_file )
-            pygame.mixer.music.load(mp3_path)
-        except pygame.error as e:
-            self.logger.error(f"Error loading {mp3_file}: {e}")
+            try:
+                self.button_playback.start(mp3_file)
+            except (OSError, pygame.error) as e:
+                self.logger.error(f"Error loading {mp3_file}: {e}")
+                return
+            timings = play_timeline(timeline, self.send_command, self.button_playback.position, self.button_playback.busy)
+        finally:
+            self.button_active.clear()
+            if ducked:
+                self.show_playback.set_volume(1.0)
+        self.report_show_timing(mp3_file, timings)
+
+        if ducked and self.show_active.is_set():
+            self.logger.warn('Button B Effect Over. Handing the LEDs back to the aircraft show')
             return
-        pygame.mixer.music.play()
-
-        for wled_command in self.config['button_b_effect'][mp3_file]:
-            self.send_command(wled_command['wled_command'])
-            if wled_command['effect_duration'] == 0:
-                while pygame.mixer.music.get_busy():
-                    time.sleep(.1)
-            else:
-                time.sleep(wled_command['effect_duration'])
-
         self.logger.warn('BUtton B Effect Over. Now going to idle mode')
-        effect_command = idle_effect or self.config.get('idle_effects')[1].get('wled_command') or "{'ps': 1}"
+        effect_command = idle_effect or self.default_idle_effect()
         self.send_command(effect_command)
 
-    def light_runway(self, callsign, distance_to_flight_deck, speed, idle_effect):
-        # Calculate the ETA based on the distance and speed
-        if speed >= self.config['min_speed_knots']:
-            eta = distance_to_flight_deck / speed * 3600  # ETA in seconds
-        else:
+    def report_show_timing(self, name, timings):
+        summary = summarize_timings(timings)
+        self.last_show_timing = summary
+        for timing in timings:
+            if not timing.skipped:
+                EFFECT_LATENESS_SECONDS.observe(timing.lateness, site=self.name)
+        if summary['skipped']:
+            EFFECT_STEPS_SKIPPED.inc(summary['skipped'], site=self.name)
+        self.logger.info(f"{name} effect timing: {summary['steps']} steps, {summary['skipped']} skipped, "
+                         f"late mean {summary['late_mean_ms']:.1f} ms / p95 {summary['late_p95_ms']:.1f} ms / "
+                         f"max {summary['late_max_ms']:.1f} ms")
+        for timing in timings:
+            self.logger.debug(f"{name} step {timing.index}: {timing.lateness * 1000:.1f} ms late"
+                              f"{' (skipped)' if timing.skipped else ''}")
+
+    def show_status(self):
+        return self.scheduler.status()
+
+    # eta: seconds until the aircraft is closest to the flight deck (Aircraft.seconds_to_flight_deck)
+    def light_runway(self, callsign, eta, idle_effect, key=None):
+        if eta is None:
             self.logger.error(f"{callsign} speed too slow; won't calculate ETA.")
-            return
+            return False
 
-        light_start_time = time.time() + (eta - self.config['start_effects_early'])
-        light_duration = self.config['start_effects_early'] + self.config['keep_runway_lit']
-        while time.time() < light_start_time:
-            remaining_time = round(light_start_time - time.time(), 2)
-            time.sleep(.2)
+        lead = self.config['start_effects_early']
+        light_start_time = clock.time() + eta - lead
+        self.scheduler.schedule(key or callsign, light_start_time,
+                                lambda: self.perform_runway_lights(callsign, idle_effect),
+                                lead, f"runway lights for {callsign}")
+        return True
 
+    def perform_runway_lights(self, callsign, idle_effect):
+        light_duration = self.config['start_effects_early'] + self.config['keep_runway_lit']
         self.logger.debug(f"{callsign} Lighting Runway for {light_duration} seconds.")
-        effect_command = "{'ps': 2}"
-        self.send_command(effect_command)
-        while light_duration > 0:
-            time.sleep(1)
-            light_duration -= 1
-        effect_command = idle_effect or self.config.get('idle_effects')[1].get('wled_command') or "{'ps': 1}"
+        self.send_command(RUNWAY_LIGHTS)
+        clock.sleep(light_duration)
+        effect_command = idle_effect or self.default_idle_effect()
         self.send_command(effect_command)
 
-
-    def play_mp3_file(self, stdscr, callsign, mp3_file, distance_to_flight_deck, speed, idle_effect):
+    # Schedule the mp3 so it finishes audio_completion_offset seconds before the
+    # aircraft reaches the flight deck. Returns as soon as the show is queued.
+    def play_mp3_file(self, callsign, mp3_file, eta, idle_effect, key=None):
         self.logger.warn(f"About to playing {mp3_file} for {callsign}")
-        try:
-            mp3_path = os.path.join(self.config.get('mp3_folder'), mp3_file)
-            pygame.mixer.music.load(mp3_path)
-            mp3_duration = MP3(mp3_path).info.length
-        except pygame.error as e:
-            self.logger.error(f"Error loading {mp3_file}: {e}")
-            if stdscr:
-                self.display_message(stdscr, f"Error loading {mp3_file}: {e}")
-            return
+        mp3_duration = self.audio.duration(mp3_file)
 
-        # Calculate the ETA based on the distance and speed
-        if speed >= self.config['min_speed_knots']:
-            eta = distance_to_flight_deck / speed * 3600  # ETA in seconds
-        else:
+        if eta is None:
             self.logger.error(f"{callsign} speed too slow; won't calculate ETA.")
-            return
+            return False
 
         # Calculate play_start_time so that the mp3 finishes when the aircraft is nearest to the flight deck
-        play_start_time = time.time()
-        play_start_time = time.time() + (eta - mp3_duration) - self.config['audio_completion_offset']
+        lead = mp3_duration + self.config['audio_completion_offset']
+        play_start_time = clock.time() + eta - lead
 
         self.logger.debug(f"ETA: {eta} seconds")
         self.logger.debug(f"MP3 Duration: {mp3_duration} seconds")
         self.logger.debug(f"Audio Completion Offset: {self.config['audio_completion_offset']} seconds")
-        self.logger.debug(f"Play Start Time: {(play_start_time - time.time()):.2f} ({play_start_time})")
-        self.logger.debug(f"Current Time: {time.time()}")
-
-
-        while time.time() < play_start_time:
-            remaining_time = round(play_start_time - time.time(), 2)
-            if stdscr:
-                self.display_message(stdscr, f"{callsign} Waiting to play {mp3_file} in {remaining_time:.2f} seconds ...")
-            time.sleep(0.2)
+        self.logger.debug(f"Play Start Time: {(play_start_time - clock.time()):.2f} ({play_start_time})")
+
+        self.scheduler.schedule(key or callsign, play_start_time,
+                                lambda: self.perform_mp3(callsign, mp3_file, idle_effect),
+                                lead, f"{mp3_file} for {callsign}")
+        return True
+
+    # Runs on the scheduler thread
+    def perform_mp3(self, callsign, mp3_file, idle_effect):
+        import pygame
+        if self.button_active.is_set():
+            self.logger.warn(f"Button B is playing; skipping {mp3_file} for {callsign}")
+            return
+        self.show_preempted.clear()
+        cue = self.scheduler.running
+        try:
+            self.show_playback.start(mp3_file)
+        except (OSError, pygame.error) as e:
+            self.logger.error(f"Error loading {mp3_file}: {e}")
+            return
+        if cue is not None:
+            AUDIO_START_DELAY_SECONDS.observe(max(clock.time() - cue.at, 0.0), site=self.name)
+        self.logger.info(f"Playing {mp3_file} for {callsign}")
 
-        if play_start_time > time.time() + .25:
+        # Steps follow the playback position, not the time since the last step
+        timeline = self.timelines['audio_effects'][mp3_file]
+        self.show_active.set()
+        try:
+            timings = play_timeline(timeline, self.send_show_command, self.show_playback.position,
+                                    self.show_playback.busy, self.show_preempted.is_set)
+            while self.show_playback.busy() and not self.show_preempted.is_set():
+                time.sleep(0.1)
+        finally:
+            self.show_active.clear()
+        self.report_show_timing(mp3_file, timings)
+        if self.show_preempted.is_set():
+            self.logger.warn(f"{mp3_file} for {callsign} was cut off by button B")
             return
-        if stdscr:
-            self.display_message(stdscr, f"Playing {mp3_file} for {callsign}")
-        pygame.mixer.music.play()
-
-        # for each wled_command in config['audio_effects'][<mp3_file_name>], play each wled_command for the effect_duration
-        for wled_command in self.config['audio_effects'][mp3_file]:
-            self.send_command(wled_command['wled_command'])
-            if wled_command['effect_duration'] == 0:
-                while pygame.mixer.music.get_busy():
-                    time.sleep(1)
-            else:
-                time.sleep(wled_command['effect_duration'])
-        while pygame.mixer.music.get_busy():
-            time.sleep(1)
 
-        if stdscr:
-            self.display_message(stdscr, f"Finished playing {mp3_file} for {callsign}")
-        time.sleep(self.config['keep_runway_lit'])
+        self.logger.info(f"Finished playing {mp3_file} for {callsign}")
+        self.logger.debug(f"WLED serial link: {self.link.stats()} | audio cache: {self.audio.stats()}")
+        clock.sleep(self.config['keep_runway_lit'])
         self.logger.debug('Turning on Idle Effects')
-        effect_command = idle_effect or "{'ps': 1}"
-        self.send_command(str(effect_command))
+        effect_command = idle_effect or IDLE_CANDLES
+        self.send_show_command(effect_command)
         self.logger.warn(f"idle Effect: {idle_effect} | effect_command: {effect_command}")
-
-    def display_message(self, stdscr, message):
-        if not stdscr:
-            return
-        stdscr.addstr(1, 0, message, curses.color_pair(1))
-        stdscr.refresh()
-
@@ -0,0 +1,96 @@
+import json
+import os
+from archive import ArchiveReader
+from clock import VirtualClock
+from sources import AircraftSource
+
+
+class ReplayFinished(Exception):
+    pass
+
+
+class ReplayFeed(AircraftSource):
+    """
+    Stand-in for Tower.fetch_aircraft_data that streams recorded snapshots, either
+    the epoch-named JSON files written by support_scripts/save_json.py or an
+    archive written by archive.ArchiveWriter.
+
+    The feed drives a VirtualClock: in paced mode (speed=1.0 or N) it hands back
+    the newest snapshot that is not in the future, just like polling a live
+    readsb; in as-fast-as-possible mode (speed=None) every fetch jumps the clock
+    to the next snapshot.
+    """
+
+    def __init__(self, path, speed=1.0, start=None, end=None):
+        self.path = path
+        if os.path.isdir(path):
+            self._frames = self.directory_frames(path, start, end)
+        else:
+            self._frames = ArchiveReader(path).frames(start, end)
+        self._next = next(self._frames, None)
+        if self._next is None:
+            raise ValueError(f"No snapshots found in {path}")
+        self.clock = VirtualClock(self._next[0], speed)
+        self.frames_served = 0
+        self.frames_skipped = 0
+        self._current = []
+
+    @staticmethod
+    def directory_frames(path, start=None, end=None):
+        snapshots = []
+        for filename in os.listdir(path):
+            name, ext = os.path.splitext(filename)
+            if ext != '.json' or not name.isdigit():
+                continue
+            timestamp = int(name)
+            if start is not None and timestamp < start:
+                continue
+            if end is not None and timestamp > end:
+                continue
+            snapshots.append((timestamp, os.path.join(path, filename)))
+        snapshots.sort()
+        return iter(snapshots)
+
+    @property
+    def finished(self):
+        return self._next is None
+
+    # Directory frames carry a file name, archive frames the decoded aircraft list
+    def load_frame(self, payload):
+        if not isinstance(payload, str):
+            return payload
+        with open(payload, 'r') as file:
+            return json.load(file).get("aircraft", [])
+
+    # Return the aircraft list that readsb would have served at the current virtual time
+    # Like fetch(), but None while the clock hasn't reached the next snapshot
+    def poll(self):
+        served = self.frames_served
+        aircraft_list = self.fetch()
+        return aircraft_list if self.frames_served != served else None
+
+    def stats(self):
+        return {'frames_served': self.frames_served, 'frames_skipped': self.frames_skipped}
+
+    def fetch(self):
+        if self.finished:
+            raise ReplayFinished(f"Replay of {self.path} finished after {self.frames_served} frames")
+
+        if self.clock.speed is None:
+            self.clock.advance_to(self._next[0])
+
+        now = self.clock.time()
+        if self._next[0] > now:
+            return self._current  # Nothing new yet, readsb would serve the same data
+
+        # Skip over snapshots the clock has already passed (e.g. after a long sleep)
+        frame = self._next
+        self._next = next(self._frames, None)
+        while self._next is not None and self._next[0] <= now:
+            frame = self._next
+            self._next = next(self._frames, None)
+            self.frames_skipped += 1
+
+        self.frames_served += 1
+        self._current = self.load_frame(frame[1])
+        return self._current
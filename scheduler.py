@@ -0,0 +1,130 @@
+import heapq
+import itertools
+import threading
+import clock
+
+
+class Cue:
+    __slots__ = ('key', 'at', 'lead', 'action', 'description', 'cancelled')
+
+    def __init__(self, key, at, lead, action, description):
+        self.key = key
+        self.at = at          # Clock time the action should start
+        self.lead = lead      # Seconds before the aircraft's arrival that `at` falls
+        self.action = action
+        self.description = description
+        self.cancelled = False
+
+
+class ShowScheduler:
+    """
+    Runs audio and lighting cues on a dedicated thread so the monitor loop keeps
+    fetching, updating and rendering while a show waits for its aircraft or is
+    playing.
+
+    Cues live in a heap ordered by start time and are keyed (normally by the
+    aircraft's hex id) so they can be retimed as new ETAs come in or cancelled
+    when the aircraft disappears. Cues run one at a time: there is one speaker
+    and one LED strip.
+    """
+
+    MAX_WAIT = 0.5  # Re-check the clock at least this often (it may be virtual)
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.heap = []
+        self.cues = {}
+        self.sequence = itertools.count()
+        self.running = None
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name='show-scheduler', daemon=True)
+        self.thread.start()
+
+    def schedule(self, key, at, action, lead=0, description=''):
+        with self.condition:
+            existing = self.cues.get(key)
+            if existing is not None:
+                existing.cancelled = True
+            cue = Cue(key, at, lead, action, description)
+            self.cues[key] = cue
+            heapq.heappush(self.heap, (at, next(self.sequence), cue))
+            self.condition.notify()
+        return cue
+
+    # Move a pending cue so it still starts `lead` seconds before the new arrival time
+    def retime(self, key, arrival_time):
+        with self.condition:
+            cue = self.cues.get(key)
+            if cue is None:
+                return False
+            at = arrival_time - cue.lead
+            if abs(at - cue.at) < 0.25:
+                return True
+            cue.cancelled = True
+            retimed = Cue(key, at, cue.lead, cue.action, cue.description)
+            self.cues[key] = retimed
+            heapq.heappush(self.heap, (at, next(self.sequence), retimed))
+            self.condition.notify()
+        return True
+
+    def cancel(self, key):
+        with self.condition:
+            cue = self.cues.pop(key, None)
+            if cue is None:
+                return False
+            cue.cancelled = True
+            self.condition.notify()
+        self.logger.debug(f"Cancelled {cue.description or key}")
+        return True
+
+    def pending_keys(self):
+        with self.condition:
+            return list(self.cues)
+
+    def seconds_until(self, key):
+        with self.condition:
+            cue = self.cues.get(key)
+        return None if cue is None else cue.at - clock.time()
+
+    def status(self):
+        with self.condition:
+            running = self.running
+            upcoming = min(self.cues.values(), key=lambda cue: cue.at, default=None)
+        if running is not None:
+            return f"Playing {running.description}"
+        if upcoming is not None:
+            return f"Waiting to play {upcoming.description} in {upcoming.at - clock.time():.2f} seconds ..."
+        return ''
+
+    # True while a cue is waiting or running
+    def busy(self):
+        with self.condition:
+            return bool(self.cues) or self.running is not None
+
+    def next_cue(self):
+        with self.condition:
+            while True:
+                while self.heap and self.heap[0][2].cancelled:
+                    heapq.heappop(self.heap)
+                if self.heap:
+                    delay = self.heap[0][0] - clock.time()
+                    if delay <= 0:
+                        cue = heapq.heappop(self.heap)[2]
+                        del self.cues[cue.key]
+                        self.running = cue
+                        return cue
+                    wait = min(clock.get_clock().to_real(delay), self.MAX_WAIT)
+                    self.condition.wait(max(wait, 0.01))
+                else:
+                    self.condition.wait(self.MAX_WAIT)
+
+    def run(self):
+        while True:
+            cue = self.next_cue()
+            try:
+                cue.action()
+            except Exception as e:
+                self.logger.error(f"Error running {cue.description or cue.key}: {e}")
+            finally:
+                with self.condition:
+                    self.running = None
@@ -0,0 +1,161 @@
+import glob
+import queue
+import threading
+import time
+from collections import deque
+from metrics import SERIAL_DROPPED, SERIAL_WRITE_SECONDS
+
+_links = {}
+_links_lock = threading.Lock()
+
+
+# One SerialLink per device, shared by every Radio that talks to it
+def get_serial_link(port_pattern, logger, baudrate=115200):
+    with _links_lock:
+        link = _links.get(port_pattern)
+        if link is None:
+            link = _links[port_pattern] = SerialLink(port_pattern, logger, baudrate)
+        return link
+
+
+class SerialLink:
+    """
+    Long-lived connection to the WLED ESP with a single writer thread.
+
+    Commands are queued with their enqueue time and written by the thread over a
+    port that stays open, so effect steps 30-100 ms apart aren't paying for a port
+    open/close (and the ESP reset that comes with toggling DTR) on every command.
+    The queue is bounded; when it fills up the oldest command is dropped, since a
+    stale lighting frame is worse than a skipped one. Lost connections are
+    retried with exponential backoff.
+    """
+
+    QUEUE_SIZE = 64
+    MIN_BACKOFF = 0.5
+    MAX_BACKOFF = 30
+    LATENCY_SAMPLES = 256
+
+    def __init__(self, port_pattern, logger, baudrate=115200):
+        self.port_pattern = port_pattern
+        self.logger = logger
+        self.baudrate = baudrate
+        self.port = None
+        self.serial = None
+        self.queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self.backoff = self.MIN_BACKOFF
+        self.next_connect_attempt = 0
+        self.latencies = deque(maxlen=self.LATENCY_SAMPLES)  # enqueue-to-wire, seconds
+        self.last_write_time = None
+        self.sent = 0
+        self.dropped = 0
+        self.errors = 0
+        self.reconnects = 0
+        self.thread = threading.Thread(target=self.writer_loop, name=f"serial-{port_pattern}", daemon=True)
+        self.thread.start()
+
+    def send(self, command):
+        payload = command if isinstance(command, bytes) else command.encode()
+        item = (time.monotonic(), payload)
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.count_dropped()
+                except queue.Empty:
+                    pass
+
+    def find_port(self):
+        for port in sorted(glob.glob(self.port_pattern)):
+            return port
+        return None
+
+    def connect(self):
+        import serial
+        now = time.monotonic()
+        if now < self.next_connect_attempt:
+            return False
+        port = self.find_port()
+        try:
+            if port is None:
+                raise serial.SerialException(f"No serial device matches {self.port_pattern}")
+            ser = serial.Serial()
+            ser.port = port
+            ser.baudrate = self.baudrate
+            ser.timeout = 1
+            ser.write_timeout = 1
+            # Leave DTR/RTS low so opening the port doesn't reset the ESP
+            ser.dtr = False
+            ser.rts = False
+            ser.open()
+        except (OSError, serial.SerialException) as e:
+            self.logger.error(f"Unable to open WLED serial port: {e}; retrying in {self.backoff:.1f}s")
+            self.next_connect_attempt = now + self.backoff
+            self.backoff = min(self.backoff * 2, self.MAX_BACKOFF)
+            return False
+
+        if self.port is not None:
+            self.reconnects += 1
+        self.port = port
+        self.serial = ser
+        self.backoff = self.MIN_BACKOFF
+        self.logger.info(f"WLED serial link open on {port}")
+        return True
+
+    def disconnect(self):
+        import serial
+        if self.serial is not None:
+            try:
+                self.serial.close()
+            except (OSError, serial.SerialException):
+                pass
+        self.serial = None
+
+    # pyserial is imported by the writer thread, off the startup path
+    def writer_loop(self):
+        import serial
+        while True:
+            enqueued_at, payload = self.queue.get()
+            if self.serial is None and not self.connect():
+                self.count_dropped()
+                continue
+            try:
+                self.serial.write(payload)
+                self.serial.flush()
+            except (OSError, serial.SerialException) as e:
+                self.errors += 1
+                self.count_dropped()
+                self.logger.error(f"Error writing to {self.port}: {e}")
+                self.disconnect()
+                continue
+            self.last_write_time = time.monotonic()
+            self.latencies.append(self.last_write_time - enqueued_at)
+            SERIAL_WRITE_SECONDS.observe(self.last_write_time - enqueued_at, port=self.port_pattern)
+            self.sent += 1
+
+    def count_dropped(self):
+        self.dropped += 1
+        SERIAL_DROPPED.inc(port=self.port_pattern)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(pct):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))] * 1000
+
+        return {
+            'port': self.port,
+            'connected': self.serial is not None,
+            'queued': self.queue.qsize(),
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'reconnects': self.reconnects,
+            'latency_p50_ms': percentile(50),
+            'latency_p95_ms': percentile(95),
+            'latency_max_ms': latencies[-1] * 1000 if latencies else None,
+        }
@@ -0,0 +1,293 @@
+from math import floor
+import clock
+from aircraft import Aircraft
+from config_reload import AUDIO_KEYS, ConfigError
+from effects import IDLE_CANDLES
+from fleet import FleetStore
+from geofence import Geofence
+from metrics import TRIGGER_DECISIONS
+from radio import Radio
+
+
+# Category -> the setting that hides it
+IGNORE_CATEGORY_KEYS = (
+    ('A1', 'ignore_light_aircraft'),
+    ('A2', 'ignore_small_aircraft'),
+    ('A3', 'ignore_large_aircraft'),
+    ('A5', 'ignore_heavy_aircraft'),
+    ('A6', 'ignore_high_performance_aircraft'),
+    ('A7', 'ignore_helicopters'),
+)
+
+# Compiled and loaded once for the whole process (timelines, AudioAssets, the mixer), so a site can't override them
+SHARED_KEYS = AUDIO_KEYS + ('idle_effects', 'audio_mode', 'mixer_buffer')
+
+
+def ignored_categories(config):
+    return frozenset(category for category, key in IGNORE_CATEGORY_KEYS if config.get(key))
+
+
+def site_configs(config):
+    """
+    (name, config) for each installation. Each entry of the optional `sites`
+    list overrides the top-level settings for that site; without one the
+    top-level config is the only site, used as is.
+
+    Several sites need audio_mode: channel. Music mode has one
+    pygame.mixer.music stream for the whole process, so one site's show would
+    cut off another's and throw off its timeline. The audio and effect
+    settings in SHARED_KEYS are top-level only: the timelines and clips are
+    compiled once and every site plays from them.
+    """
+    sites = config.get('sites')
+    if not sites:
+        return [(config.get('site_name', 'flightdeck'), config)]
+    if len(sites) > 1 and config.get('audio_mode', 'music') != 'channel':
+        raise ConfigError(f"{len(sites)} sites need audio_mode: channel; music mode has one stream for every site")
+    for index, entry in enumerate(sites):
+        overridden = [key for key in SHARED_KEYS if key in entry]
+        if overridden:
+            name = entry.get('name', f"site{index + 1}")
+            raise ConfigError(f"Site {name} sets {', '.join(overridden)}; audio and effects are shared, set them at the top level")
+    base = {key: value for key, value in config.items() if key != 'sites'}
+    return [(entry.get('name', f"site{index + 1}"), {**base, **entry}) for index, entry in enumerate(sites)]
+
+
+class Site:
+    """
+    One flight deck: its own LEDs and audio (Radio), tracked aircraft, chatter
+    budget and trigger decisions. Every site is fed from Tower's single ingest.
+
+    Tracking is per site because everything an Aircraft works out (distance,
+    closest approach, landing/takeoff phase) is relative to this site's deck
+    and runways; what the sites share is the one fetch and parse of the feed.
+    """
+
+    def __init__(self, name, config, logger, timelines, audio, index=0):
+        self.name = name
+        self.config = config
+        self.logger = logger
+        self.radio = Radio(config, logger, timelines, audio, channel_base=2 * index, name=name)
+        self.unique_aircraft = FleetStore(config, logger, self.radio)
+        self.geofence = Geofence(config)
+        self.ignored_categories = ignored_categories(config)
+        self.last_chatter_time = clock.time()
+        self.chatter_allowed = False
+        self.idle_effect = IDLE_CANDLES
+        self.mp3_files = []
+        self.mp3_idx = 0
+        self.nearby_aircraft = []
+
+    def load_mp3_files(self):
+        self.mp3_files = Aircraft.get_shuffled_mp3_list(self, self.config)
+        self.mp3_idx = 0
+
+    # Config reload, between ticks. Tracking survives unless the deck moved, since
+    # distances and predicted closest approaches are relative to it.
+    def reconfigure(self, config, timelines, audio):
+        old = self.config
+        self.config = config
+        self.radio.reconfigure(config, timelines, audio)
+        if (config['flight_deck_latitude'], config['flight_deck_longitude']) != (old['flight_deck_latitude'], old['flight_deck_longitude']):
+            self.logger.info(f"{self.name}: flight deck moved, tracking starts over")
+            self.unique_aircraft = FleetStore(config, self.logger, self.radio)
+        else:
+            self.unique_aircraft.config = config
+        self.geofence = Geofence(config)
+        self.ignored_categories = ignored_categories(config)
+        if set(config.get('audio_effects') or {}) != set(old.get('audio_effects') or {}):
+            self.load_mp3_files()
+
+    # Returns seconds until chatter is allowed again based on config
+    def can_chatter_when(self):
+        current_time = clock.time()
+        elapsed_time = current_time - self.last_chatter_time # time since last chatter
+        allowed_frequency = 3600 / self.config['chatter_per_hour'] # in seconds
+
+        when_to_chatter = allowed_frequency - elapsed_time
+        if when_to_chatter <= 0:
+            return 0 # chatter is allowed immediately
+
+        # return seconds until next allowed chatter
+        return allowed_frequency - elapsed_time
+
+    # returns True or False if chatter is allowed
+    def can_chatter(self):
+        current_time = clock.time()
+        elapsed_time = current_time - self.last_chatter_time
+        allowed_frequency = 3600 / self.config['chatter_per_hour'] # in seconds
+        self.chatter_allowed = (elapsed_time >= allowed_frequency)
+        return self.chatter_allowed
+
+    def ingest_aircraft_data(self, aircraft_list):
+        # Forget aircraft we haven't heard from. The FleetStore remembers which of them already
+        # triggered audio, so one that comes back is still hidden by ignore_aircraft.
+        evicted = self.unique_aircraft.evict_expired(clock.time(), self.config['expire_old_planes'])
+        if evicted:
+            self.logger.debug(f"{self.name}: evicted {evicted} stale aircraft, tracking {len(self.unique_aircraft)}.")
+        # Most of a good antenna's feed is far outside the radius; drop new aircraft there before
+        # any Aircraft work. Tracked ones are always updated so their position never goes stale.
+        geofence = self.geofence
+        for aircraft_data in aircraft_list:
+            hex_id = aircraft_data.get("hex")
+            aircraft = self.unique_aircraft.get(hex_id)
+            if not geofence.admits(aircraft_data, aircraft is not None):
+                continue
+            if aircraft is None:
+                self.unique_aircraft.add(hex_id, aircraft_data)
+            else:
+                aircraft.update_data(aircraft_data)
+        self.unique_aircraft.update_geometry()
+
+    # Filter invalid aircraft and aircraft we want to ignore
+    def filter_aircraft(self):
+        self.nearby_aircraft = [
+            aircraft for aircraft in self.unique_aircraft.values()
+            if not self.ignore_aircraft(aircraft) and self.valid_aircraft(aircraft)
+        ]
+        return self.nearby_aircraft
+
+    # Check if the aircraft is in the monitoring radius
+    # and invalidate aircraft with bad ADS-B data
+    def valid_aircraft(self, aircraft):
+        if aircraft.altitude == 99999:
+            return False
+        elif aircraft.latitude == 0:
+            return False
+        elif aircraft.longitude == 0:
+            return False
+        elif aircraft.callsign == "Unknown":
+            return False
+        elif aircraft.track == 0:
+            return False
+        elif aircraft.speed == 0:
+            return False
+        elif not aircraft.is_in_monitoring_radius():
+            self.last_seen = clock.time()
+            return False
+        else:
+            return True
+
+    def ignore_aircraft(self, aircraft):
+        if aircraft.category.startswith('C'):  # Ignore all ground vehicles
+            return True
+        if aircraft.category.startswith('B'):  # Ignore all ground gliders
+            return True
+        if aircraft.category in self.ignored_categories:  # ignore_helicopters, ignore_light_aircraft...
+            return True
+        if clock.time() - aircraft.last_seen > self.config['expire_old_planes']:
+            return True
+        # Let a plane stay in the stats for 1 min after audio has triggered
+        if aircraft.has_triggered_audio and aircraft.has_triggered_audio + self.config['expire_old_planes'] < clock.time():
+            return True
+
+        return False
+
+    # Decide whether the closest aircraft gets a show; returns a status line for the display, if any
+    def process_closest_aircraft(self, nearby_aircraft=None):
+        nearby_aircraft = self.nearby_aircraft if nearby_aircraft is None else nearby_aircraft
+        if not nearby_aircraft:
+            return None
+        closest_aircraft = min(nearby_aircraft, key=lambda ac: ac.calculate_closest_distance())
+
+        if self.radio.scheduler.busy():
+            # One show at a time; it runs on the scheduler thread while we keep tracking
+            return self.radio.show_status()
+
+        if closest_aircraft.has_triggered_audio:
+            return None
+        if closest_aircraft.is_trigger_ready():
+            if self.can_chatter():
+                if not self.mp3_files:
+                    return "No MP3 files to play."
+                TRIGGER_DECISIONS.inc(site=self.name, decision='show')
+                self.logger.debug(f"{self.name}: playing MP3 for {closest_aircraft.callsign}")
+                self.radio.play_mp3_file(closest_aircraft.callsign, self.mp3_files[self.mp3_idx], closest_aircraft.seconds_to_flight_deck(), self.idle_effect, key=closest_aircraft.id)
+                closest_aircraft.has_triggered_audio = clock.time()  # Update flag after scheduling the audio
+                if self.mp3_idx < len(self.mp3_files)-1:
+                    self.mp3_idx += 1
+                else:
+                    self.mp3_idx = 0
+                self.last_chatter_time = clock.time()  # Update last chatter time for use in chatter frequency calculations
+                self.logger.info(f"{self.name}: playing MP3 for aircraft: {closest_aircraft.callsign}")
+                return None
+            if self.config['always_light_runway']:
+                TRIGGER_DECISIONS.inc(site=self.name, decision='runway')
+                self.radio.light_runway(closest_aircraft.callsign, closest_aircraft.seconds_to_flight_deck(), self.idle_effect, key=closest_aircraft.id)
+                closest_aircraft.has_triggered_audio = clock.time()  # Update flag after lighting runway
+            elif not closest_aircraft.held_for_chatter:
+                # Checked every tick while it waits; count the aircraft, not the ticks
+                closest_aircraft.held_for_chatter = True
+                TRIGGER_DECISIONS.inc(site=self.name, decision='held')
+            return f"{format_time(self.can_chatter_when())} until chatter allowed."
+        if not self.can_chatter():
+            self.logger.warn(f"{self.name}: {format_time(self.can_chatter_when())} until chatter allowed.")
+            return f"{format_time(self.can_chatter_when())} until chatter allowed."
+        return None
+
+    # Keep pending shows lined up with their aircraft's latest predicted closest approach
+    def update_scheduled_shows(self):
+        scheduler = self.radio.scheduler
+        for key in scheduler.pending_keys():
+            aircraft = self.unique_aircraft.get(key)
+            if aircraft is None:
+                scheduler.cancel(key)  # Aircraft expired before its show started
+                continue
+            eta = aircraft.seconds_to_flight_deck()
+            if eta is not None:
+                scheduler.retime(key, clock.time() + eta)
+
+
+#function to trun seconds into string format: ##min:ss
+def format_time(seconds):
+    minutes = seconds // 60
+    seconds = seconds % 60
+    return f"{minutes:.0f}min {seconds:.0f}sec"
+
+
+class SiteIndex:
+    """
+    Grid of CELL_DEGREES lat/lon cells, each listing the sites whose geofence
+    box overlaps it, so routing a raw aircraft dict to the sites that could
+    care about it is one dict lookup however many sites there are. Aircraft
+    without a position go to every site; each geofence then keeps them only
+    if that site already tracks them.
+    """
+
+    CELL_DEGREES = 0.25
+    LON_CELLS = int(360 / CELL_DEGREES)
+
+    def __init__(self, sites):
+        self.sites = sites
+        self.cells = {}
+        for site in sites:
+            box = site.geofence
+            first_lat = floor((box.latitude - box.lat_span) / self.CELL_DEGREES)
+            last_lat = floor((box.latitude + box.lat_span) / self.CELL_DEGREES)
+            first_lon = floor((box.longitude - box.lon_span) / self.CELL_DEGREES)
+            last_lon = floor((box.longitude + box.lon_span) / self.CELL_DEGREES)
+            for lat_cell in range(first_lat, last_lat + 1):
+                for lon_cell in range(first_lon, min(last_lon, first_lon + self.LON_CELLS - 1) + 1):
+                    key = (lat_cell, lon_cell % self.LON_CELLS)
+                    self.cells[key] = self.cells.get(key, ()) + (site,)
+
+    def candidates(self, data):
+        latitude = data.get('lat')
+        longitude = data.get('lon')
+        if latitude is None or longitude is None:
+            return self.sites
+        try:
+            key = (floor(latitude / self.CELL_DEGREES), floor(longitude / self.CELL_DEGREES) % self.LON_CELLS)
+        except TypeError:
+            return self.sites
+        return self.cells.get(key, ())
+
+    # Split one feed's aircraft into a list per site, in self.sites order
+    def route(self, aircraft_list):
+        if len(self.sites) == 1:
+            return [aircraft_list]  # The site's geofence does the same job on its own
+        routed = {site: [] for site in self.sites}
+        for aircraft_data in aircraft_list:
+            for site in self.candidates(aircraft_data):
+                routed[site].append(aircraft_data)
+        return [routed[site] for site in self.sites]
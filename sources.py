@@ -0,0 +1,197 @@
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+class AircraftSource(ABC):
+    """
+    Where Tower gets aircraft from.
+
+    poll() is called every monitor tick and returns a list of aircraft dicts in
+    tar1090's aircraft.json shape (hex, flight, category, track, alt_baro, gs,
+    lat, lon, baro_rate) when there is something new, or None when there
+    isn't. Tar1090Client, SbsSource and ReplayFeed implement it.
+    """
+
+    @abstractmethod
+    def poll(self):
+        pass
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+# SBS-1 (BaseStation) field positions, see readsb's --net-sbs-port output
+SBS_HEX = 4
+SBS_CALLSIGN = 10
+SBS_ALTITUDE = 11
+SBS_GROUND_SPEED = 12
+SBS_TRACK = 13
+SBS_LATITUDE = 14
+SBS_LONGITUDE = 15
+SBS_VERTICAL_RATE = 16
+SBS_ON_GROUND = 21
+
+SBS_NUMBERS = (
+    (SBS_ALTITUDE, 'alt_baro', int),
+    (SBS_GROUND_SPEED, 'gs', float),
+    (SBS_TRACK, 'track', float),
+    (SBS_LATITUDE, 'lat', float),
+    (SBS_LONGITUDE, 'lon', float),
+    (SBS_VERTICAL_RATE, 'baro_rate', int),
+)
+
+
+def parse_sbs_line(line, state):
+    """
+    Merge one SBS MSG line into state (hex -> aircraft dict); returns the hex
+    it updated, or None for lines that carry nothing we use.
+    """
+    fields = line.split(',')
+    if len(fields) < 17 or fields[0] != 'MSG':
+        return None
+    hex_id = fields[SBS_HEX].strip().lower()
+    if not hex_id:
+        return None
+    aircraft = state.get(hex_id) or {'hex': hex_id}
+    updated = False
+    callsign = fields[SBS_CALLSIGN]
+    if callsign.strip():
+        aircraft['flight'] = callsign
+        updated = True
+    for index, key, convert in SBS_NUMBERS:
+        value = fields[index]
+        if value:
+            try:
+                aircraft[key] = convert(float(value)) if convert is int else convert(value)
+            except ValueError:
+                continue
+            updated = True
+    if len(fields) > SBS_ON_GROUND and fields[SBS_ON_GROUND] in ('-1', '1'):
+        aircraft['alt_baro'] = 'ground'
+        updated = True
+    if not updated:
+        return None
+    state[hex_id] = aircraft
+    return hex_id
+
+
+class SbsSource(AircraftSource):
+    """
+    Aircraft straight off readsb's SBS TCP output (port 30003 by default),
+    skipping aircraft.json's once-a-second aggregation.
+
+    A reader thread decodes lines as they arrive and merges them into
+    per-aircraft state; poll() hands Tower the aircraft updated since the last
+    poll. SBS carries no emitter category, so category-based ignores don't
+    apply to aircraft from this source. Lost connections are retried with
+    exponential backoff.
+    """
+
+    MIN_BACKOFF = 0.5
+    MAX_BACKOFF = 30
+    READ_SIZE = 65536
+    STATE_TTL = 300  # Drop aircraft we haven't heard from in this many seconds
+
+    def __init__(self, host, port, logger):
+        self.host = host
+        self.port = port
+        self.logger = logger
+        self.state = {}
+        self.changed = set()
+        self.updated_at = {}  # hex -> time.monotonic() of its last message
+        self.last_prune = time.monotonic()
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.bad_lines = 0
+        self.reconnects = 0
+        self.connected = False
+        self.closed = False
+        self.sock = None
+        self.thread = threading.Thread(target=self.reader_loop, name=f"sbs-{host}:{port}", daemon=True)
+        self.thread.start()
+
+    def poll(self):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_prune > self.STATE_TTL / 5:
+                self.prune(now)
+                self.last_prune = now
+            if not self.changed:
+                return None
+            aircraft_list = [dict(self.state[hex_id]) for hex_id in self.changed]
+            self.changed.clear()
+        return aircraft_list
+
+    def reader_loop(self):
+        backoff = self.MIN_BACKOFF
+        while not self.closed:
+            try:
+                self.sock = socket.create_connection((self.host, self.port), timeout=10)
+            except OSError as e:
+                self.logger.error(f"Unable to connect to SBS feed {self.host}:{self.port}: {e}; retrying in {backoff:.1f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+                continue
+            self.sock.settimeout(None)
+            self.connected = True
+            backoff = self.MIN_BACKOFF
+            self.logger.info(f"Connected to SBS feed {self.host}:{self.port}")
+            try:
+                self.read_lines(self.sock)
+            except OSError as e:
+                if not self.closed:
+                    self.logger.error(f"SBS feed {self.host}:{self.port} dropped: {e}")
+            finally:
+                self.connected = False
+                self.sock.close()
+            if not self.closed:
+                self.reconnects += 1
+                time.sleep(self.MIN_BACKOFF)
+
+    def read_lines(self, sock):
+        pending = b''
+        while True:
+            chunk = sock.recv(self.READ_SIZE)
+            if not chunk:
+                return
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()  # Partial line, finished by the next chunk
+            now = time.monotonic()
+            with self.lock:
+                for line in lines:
+                    hex_id = parse_sbs_line(line.decode('ascii', 'replace').rstrip('\r'), self.state)
+                    if hex_id is None:
+                        self.bad_lines += 1
+                    else:
+                        self.messages += 1
+                        self.changed.add(hex_id)
+                        self.updated_at[hex_id] = now
+
+    def prune(self, now):
+        for hex_id in [hex_id for hex_id, seen in self.updated_at.items() if now - seen > self.STATE_TTL]:
+            del self.updated_at[hex_id]
+            self.state.pop(hex_id, None)
+            self.changed.discard(hex_id)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'connected': self.connected,
+                'aircraft': len(self.state),
+                'messages': self.messages,
+                'ignored_lines': self.bad_lines,
+                'reconnects': self.reconnects,
+            }
+
+    def close(self):
+        self.closed = True
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
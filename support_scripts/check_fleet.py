@@ -0,0 +1,91 @@
+import argparse
+import logging
+import math
+import os
+import sys
+
+# Check a site's tracking of one aircraft through a full pass, on a virtual
+# clock: it is picked up near the deck and has its show, flies out of the
+# geofence (its position must keep updating and it must leave the nearby list),
+# goes silent until it is evicted, then comes back near the deck (it must still
+# count as triggered and stay hidden). Once FleetStore.TRIGGER_MEMORY has gone
+# by it is treated as a new aircraft again. Exits 1 if any step fails.
+#
+#   python support_scripts/check_fleet.py
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import yaml  # noqa: E402
+import clock  # noqa: E402
+from fleet import FleetStore  # noqa: E402
+from sites import Site  # noqa: E402
+
+
+def report(config, miles_north, hex_id='c0ffee'):
+    return {
+        'hex': hex_id,
+        'flight': 'CHK123  ',
+        'category': 'A3',
+        'track': 180.0,
+        'alt_baro': 1500,
+        'gs': 140.0,
+        'lat': config['flight_deck_latitude'] + miles_north / 69.0,
+        'lon': config['flight_deck_longitude'],
+        'baro_rate': -700,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that an aircraft that had its show is not triggered again')
+    parser.add_argument('--config', default='config.yml')
+    args = parser.parse_args()
+
+    with open(args.config) as file:
+        config = yaml.safe_load(file)
+    logger = logging.getLogger('check_fleet')
+    virtual_clock = clock.VirtualClock(1_700_000_000, speed=None)
+    clock.set_clock(virtual_clock)
+    site = Site('check', config, logger, None, None)
+    ttl = config['expire_old_planes']
+    far = max(config['aircraft_monitoring_radius'], config['aircraft_trigger_radius']) * 3
+
+    failures = 0
+
+    def check(label, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {label}")
+
+    def tick(seconds, *reports):
+        virtual_clock.advance_to(clock.time() + seconds)
+        site.ingest_aircraft_data(list(reports))
+        return site.filter_aircraft()
+
+    nearby = tick(0, report(config, 1))
+    aircraft = site.unique_aircraft.get('c0ffee')
+    check("picked up near the deck", aircraft in nearby)
+    aircraft.has_triggered_audio = clock.time()  # What process_closest_aircraft does once the show is scheduled
+
+    for step in range(1, 6):
+        nearby = tick(10, report(config, far * step / 5))
+    check("position follows it out of the geofence", math.isclose(aircraft.latitude, report(config, far)['lat']))
+    check("dropped from the nearby list", aircraft not in nearby)
+
+    tick(ttl + 30)
+    check("evicted once silent for expire_old_planes", 'c0ffee' not in site.unique_aircraft)
+
+    nearby = tick(60, report(config, 1))
+    returned = site.unique_aircraft.get('c0ffee')
+    check("comes back still marked as triggered", returned is not None and bool(returned.has_triggered_audio))
+    check("stays hidden from the nearby list", returned not in nearby)
+
+    tick(ttl + 30)
+    tick(FleetStore.TRIGGER_MEMORY)
+    nearby = tick(60, report(config, 1))
+    returned = site.unique_aircraft.get('c0ffee')
+    check("treated as new after TRIGGER_MEMORY", returned in nearby and not returned.has_triggered_audio)
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import argparse
+import logging
+import math
+import os
+import random
+import sys
+
+# Check that the vectorized geometry pass (FleetStore.update_geometry) agrees
+# with the scalar Aircraft.refresh_geometry fallback on random aircraft around
+# the configured flight deck: the same predicate flags, and distance and
+# along-track distance within --tolerance miles. Exits 1 on any mismatch.
+#
+#   python support_scripts/check_geometry.py --count 2000
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import yaml  # noqa: E402
+from fleet import FleetStore  # noqa: E402
+
+
+def random_aircraft(config, rng, index, radius):
+    distance = rng.uniform(0, radius)
+    angle = rng.uniform(0, 2 * math.pi)
+    lat = config['flight_deck_latitude'] + distance * math.cos(angle) / 69.0
+    lon = config['flight_deck_longitude'] + distance * math.sin(angle) / (69.0 * math.cos(math.radians(lat)))
+    return {
+        'hex': f"{index:06x}",
+        'flight': f"CHK{index:<5}",
+        'track': round(rng.uniform(0, 360), 1),
+        'alt_baro': rng.randint(0, 40000),
+        'gs': round(rng.uniform(0, 500), 1),
+        'lat': round(lat, 6),
+        'lon': round(lon, 6),
+        'baro_rate': rng.randint(-2000, 2000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check vectorized against scalar fleet geometry')
+    parser.add_argument('--config', default='config.yml')
+    parser.add_argument('--count', type=int, default=2000, help="Random aircraft to check (Default: 2000)")
+    parser.add_argument('--radius', type=float, default=None,
+                        help="Miles around the deck to place them (Default: twice the monitoring radius)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--tolerance', type=float, default=1e-6, help="Allowed distance difference in miles")
+    args = parser.parse_args()
+
+    with open(args.config) as file:
+        config = yaml.safe_load(file)
+    rng = random.Random(args.seed)
+    radius = args.radius or config['aircraft_monitoring_radius'] * 2
+    fleet = FleetStore(config, logging.getLogger('check_geometry'), None)
+    for index in range(args.count):
+        data = random_aircraft(config, rng, index, radius)
+        fleet.add(data['hex'], data)
+
+    fleet.update_geometry()
+    vectorized = {hex_id: (aircraft.flags, aircraft.distance_from_center_miles, aircraft.closest_distance)
+                  for hex_id, aircraft in fleet.items()}
+
+    mismatches = 0
+    for hex_id, aircraft in fleet.items():
+        aircraft.refresh_geometry()
+        flags, distance, along_track = vectorized[hex_id]
+        if (flags != aircraft.flags or abs(distance - aircraft.distance_from_center_miles) > args.tolerance
+                or abs(along_track - aircraft.closest_distance) > args.tolerance):
+            mismatches += 1
+            print(f"{hex_id}: vectorized flags={flags} distance={distance:.6f} along={along_track:.6f}, "
+                  f"scalar flags={aircraft.flags} distance={aircraft.distance_from_center_miles:.6f} "
+                  f"along={aircraft.closest_distance:.6f}")
+
+    ready = sum(1 for flags, _, _ in vectorized.values() if flags)
+    print(f"{args.count - mismatches}/{args.count} aircraft agree ({ready} with at least one flag set)")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import argparse
+import math
+import os
+import random
+import sys
+
+# Check TrackPredictor's closest-approach ETA on simulated noisy tracks: an
+# aircraft flying a straight line that passes --abeam miles from the deck,
+# reporting once a second with position, ground speed and track noise. After
+# each report (from the fifth on, while the aircraft is still approaching) the
+# predicted ETA is compared with the true time of closest approach, next to the
+# old distance / speed estimate. Exits 1 if the predictor's mean absolute
+# error is over --max-error seconds; single estimates jitter by more than that
+# (see p95 and worst), mostly from position noise feeding the velocity.
+#
+#   python support_scripts/check_predictor.py --abeam 2 --tracks 50
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from predictor import MILES_PER_DEGREE, TrackPredictor  # noqa: E402
+
+DECK_LAT = 32.7178
+DECK_LON = -117.1276
+
+
+def simulate(rng, args):
+    speed = rng.uniform(120, 250)  # knots
+    track = rng.uniform(0, 360)
+    heading = math.radians(track)
+    # Starts args.start miles short of the closest point, args.abeam miles off to the side
+    lon_scale = MILES_PER_DEGREE * math.cos(math.radians(DECK_LAT))
+    predictor = TrackPredictor(DECK_LAT, DECK_LON)
+    cpa_time = args.start / speed * 3600
+    errors = []
+    naive_errors = []
+    for second in range(int(cpa_time)):
+        along = -args.start + speed / 3600 * second
+        # Position in the deck's east/north frame: along the track plus the abeam offset
+        x = along * math.sin(heading) + args.abeam * math.cos(heading)
+        y = along * math.cos(heading) - args.abeam * math.sin(heading)
+        x += rng.gauss(0, args.position_noise)
+        y += rng.gauss(0, args.position_noise)
+        reported_speed = speed + rng.gauss(0, args.speed_noise)
+        reported_track = (track + rng.gauss(0, args.track_noise)) % 360
+        predictor.update(second, DECK_LAT + y / MILES_PER_DEGREE, DECK_LON + x / lon_scale,
+                         reported_speed, reported_track)
+        remaining = cpa_time - second
+        if predictor.samples < 5 or remaining < args.min_remaining:
+            continue
+        errors.append(predictor.seconds_to_closest_approach(second) - remaining)
+        naive_errors.append(math.hypot(x, y) / reported_speed * 3600 - remaining)
+    return errors, naive_errors
+
+
+def mean_error(errors):
+    return sum(abs(error) for error in errors) / len(errors)
+
+
+def summarize(errors):
+    ranked = sorted(abs(error) for error in errors)
+    worst = max(errors, key=abs)
+    return f"mean |error| {mean_error(errors):.2f} s, p95 {ranked[int(len(ranked) * 0.95)]:.2f} s, worst {worst:+.2f} s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check TrackPredictor ETAs against simulated noisy tracks')
+    parser.add_argument('--tracks', type=int, default=50, help="Simulated aircraft (Default: 50)")
+    parser.add_argument('--abeam', type=float, default=2.0, help="Miles the track passes abeam the deck (Default: 2)")
+    parser.add_argument('--start', type=float, default=6.0, help="Miles short of the closest point to start (Default: 6)")
+    parser.add_argument('--position-noise', type=float, default=0.02, help="Position noise sigma in miles")
+    parser.add_argument('--speed-noise', type=float, default=3.0, help="Ground speed noise sigma in knots")
+    parser.add_argument('--track-noise', type=float, default=2.0, help="Track noise sigma in degrees")
+    parser.add_argument('--min-remaining', type=float, default=10.0,
+                        help="Ignore estimates made this close to the closest approach (seconds)")
+    parser.add_argument('--max-error', type=float, default=2.0, help="Allowed mean predictor error in seconds")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    errors = []
+    naive_errors = []
+    for _ in range(args.tracks):
+        track_errors, track_naive_errors = simulate(rng, args)
+        errors.extend(track_errors)
+        naive_errors.extend(track_naive_errors)
+
+    print(f"{args.tracks} tracks passing {args.abeam} mi abeam, {len(errors)} estimates")
+    print(f"  TrackPredictor:  {summarize(errors)}")
+    print(f"  distance/speed:  {summarize(naive_errors)}")
+    return 1 if mean_error(errors) > args.max_error else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import argparse
+import datetime
+import os
+import socket
+import sys
+import threading
+import time
+
+# Serve recorded snapshots as an SBS-1 (BaseStation) TCP feed, like readsb's
+# port 30003, so `ingest: sbs` can be tried without a receiver:
+#
+#   python support_scripts/fake_sbs_feeder.py simulate_data --port 30003 --speed 10
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from replay import ReplayFeed, ReplayFinished  # noqa: E402
+
+
+def sbs_lines(aircraft, timestamp):
+    when = datetime.datetime.fromtimestamp(timestamp)
+    date = when.strftime('%Y/%m/%d')
+    clock_time = when.strftime('%H:%M:%S.%f')[:-3]
+    hex_id = aircraft.get('hex', '').upper()
+    if not hex_id:
+        return []
+
+    def message(kind, callsign='', altitude='', speed='', track='', lat='', lon='', rate='', ground=''):
+        fields = ['MSG', str(kind), '1', '1', hex_id, '1', date, clock_time, date, clock_time,
+                  callsign, altitude, speed, track, lat, lon, rate, '', '', '', '', ground]
+        return ','.join(fields) + '\r\n'
+
+    def value(key):
+        item = aircraft.get(key)
+        return '' if item is None else str(item)
+
+    on_ground = aircraft.get('alt_baro') == 'ground'
+    altitude = '' if on_ground else value('alt_baro')
+    lines = []
+    if aircraft.get('flight'):
+        lines.append(message(1, callsign=aircraft['flight']))
+    if 'lat' in aircraft and 'lon' in aircraft:
+        lines.append(message(3, altitude=altitude, lat=value('lat'), lon=value('lon'), ground='-1' if on_ground else '0'))
+    if 'gs' in aircraft or 'track' in aircraft:
+        lines.append(message(4, speed=value('gs'), track=value('track'), rate=value('baro_rate')))
+    return lines
+
+
+def serve_client(conn, address, path, speed):
+    print(f"{address[0]}:{address[1]} connected")
+    feed = ReplayFeed(path, speed=speed)
+    try:
+        while True:
+            try:
+                aircraft_list = feed.poll()
+            except ReplayFinished:
+                break
+            if aircraft_list:
+                now = feed.clock.time()
+                payload = ''.join(line for aircraft in aircraft_list for line in sbs_lines(aircraft, now))
+                conn.sendall(payload.encode('ascii', 'replace'))
+            time.sleep(0.05)
+    except OSError:
+        pass
+    finally:
+        conn.close()
+        print(f"{address[0]}:{address[1]} finished after {feed.frames_served} frames")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded snapshots as an SBS TCP feed')
+    parser.add_argument('path', help="save_json.py directory or archive to replay")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=30003)
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed multiplier (Default: 1.0)")
+    args = parser.parse_args()
+
+    server = socket.create_server((args.host, args.port))
+    print(f"Serving {args.path} as SBS on {args.host}:{args.port}")
+    while True:
+        conn, address = server.accept()
+        threading.Thread(target=serve_client, args=(conn, address, args.path, args.speed), daemon=True).start()
+
+
+if __name__ == '__main__':
+    main()
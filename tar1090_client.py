@@ -0,0 +1,127 @@
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3Error
+from ingest import AircraftParser
+from metrics import FETCH_RESULTS, FETCH_SECONDS
+from sources import AircraftSource
+
+
+class Tar1090Client(AircraftSource):
+    """
+    Polls tar1090's aircraft.json over one kept-alive connection.
+
+    Requests carry a timeout and, once the server has sent an ETag or
+    Last-Modified, the matching conditional headers, so an unchanged file costs
+    a 304 and no parse. readsb only rewrites aircraft.json about once a second,
+    so a payload whose `now` hasn't advanced is skipped too, and polling follows
+    the feeder: after a new frame the client waits most of the measured update
+    interval before polling again, then polls every MIN_INTERVAL until the next
+    frame shows up.
+    """
+
+    MIN_INTERVAL = 0.1       # Fastest poll while waiting for a new frame
+    DEFAULT_INTERVAL = 1.0   # readsb's default json write interval
+    EARLY_FRACTION = 0.8     # Start polling this far into the expected interval
+    LATENCY_SAMPLES = 256
+
+    def __init__(self, url, timeout=2.0):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.parser = AircraftParser()
+        self.etag = None
+        self.last_modified = None
+        self.last_now = None
+        self.interval = self.DEFAULT_INTERVAL  # Smoothed seconds between new frames
+        self.next_poll = 0.0
+        self.latencies = deque(maxlen=self.LATENCY_SAMPLES)
+        self.fetches = 0
+        self.new_frames = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.errors = 0
+
+    def due(self):
+        return time.monotonic() >= self.next_poll
+
+    def poll(self):
+        if not self.due():
+            return None
+        return self.fetch()
+
+    # The aircraft list of a new frame, or None when there is nothing new yet
+    def fetch(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
+        start = time.monotonic()
+        self.next_poll = start + self.MIN_INTERVAL
+        self.fetches += 1
+        try:
+            with self.session.get(self.url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304:
+                    self.not_modified += 1
+                    FETCH_RESULTS.inc(result='not_modified')
+                    self.record_latency(time.monotonic() - start, '304')
+                    return None
+                response.raise_for_status()
+                try:
+                    aircraft_list = self.parser.read_response(response)
+                except Urllib3Error as e:
+                    # Reading response.raw skips requests' exception wrapping; raise what callers catch
+                    raise requests.ConnectionError(f"Error reading {self.url}: {e}") from e
+                self.etag = response.headers.get('ETag')
+                self.last_modified = response.headers.get('Last-Modified')
+        except Exception:
+            self.errors += 1
+            FETCH_RESULTS.inc(result='error')
+            FETCH_SECONDS.observe(time.monotonic() - start, status='error')
+            raise
+        elapsed = time.monotonic() - start
+
+        now = self.parser.now
+        if now is not None and now == self.last_now:
+            # A full download and parse for nothing; kept apart from the 200s that brought a frame
+            self.unchanged += 1
+            FETCH_RESULTS.inc(result='unchanged')
+            self.record_latency(elapsed, 'unchanged')
+            return None
+        self.record_latency(elapsed, '200')
+        if now is not None and self.last_now is not None and now > self.last_now:
+            gap = min(max(now - self.last_now, self.MIN_INTERVAL), 5.0)
+            self.interval += (gap - self.interval) * 0.2
+        self.last_now = now
+        self.new_frames += 1
+        FETCH_RESULTS.inc(result='new_frame')
+        self.next_poll = start + max(self.interval * self.EARLY_FRACTION, self.MIN_INTERVAL)
+        return aircraft_list
+
+    def record_latency(self, seconds, status):
+        self.latencies.append(seconds)
+        FETCH_SECONDS.observe(seconds, status=status)
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(pct):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))] * 1000
+
+        return {
+            'fetches': self.fetches,
+            'new_frames': self.new_frames,
+            'not_modified': self.not_modified,
+            'unchanged': self.unchanged,
+            'errors': self.errors,
+            'interval_s': self.interval,
+            'latency_p50_ms': percentile(50),
+            'latency_p95_ms': percentile(95),
+        }
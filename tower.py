@@ -1,47 +1,80 @@
-import curses
-import pprint
-import logging
-import requests
 import logging
 import logging.handlers
 import time
-import pygame
-import yaml
-from aircraft import Aircraft
-from rpi_rf import RFDevice
-from radio import Radio
+import clock
+from audio_assets import AudioAssets, AudioAssetError
+from effects import compile_effects, EffectError, IDLE_CANDLES
+from config_reload import (AUDIO_KEYS, RESTART_KEYS, CompiledConfig, ConfigError, ConfigWatcher, changed_keys,
+                           load_compiled_config)
+from ingest import ParseError
+from metrics import AIRCRAFT, TICK_SECONDS, start_metrics_server
+from profiling import SamplingProfiler, StageTimer, StartupTimer
+from replay import ReplayFinished
+from sites import Site, SiteIndex, site_configs
+
+# pygame, curses, requests (through tar1090_client) and rpi_rf are imported where they are
+# first needed, so startup isn't waiting on modules a given run may never use
 
 
 class Tower:
-    def __init__(self, config_file='config.yml'):
+    # startup: a StartupTimer already running (main.py starts one before its imports)
+    def __init__(self, config_file='config.yml', data_source=None, hardware=True, startup=None):
+        self.startup = startup or StartupTimer()
         self.setup_logging()
+        self.startup.mark('logging')
+        self.config_file = config_file
         self.load_config(config_file)
-        self.unique_aircraft = {}
         self.spinner_chars = ['°','º','¤','ø',',','¸','¸',',','ø','¤','º','°','`']
         self.arrival_icon = '\u1F6EC'
         self.depart_icon = '\u1F6EB'
         self.checked_box = '\u2705'
         self.unchecked_box = ' ' #'\u2B1B'
-        self.last_chatter_time = time.time()
-        self.chatter_allowed = False
         self.idle_fx_idx = 1
-        self.idle_effect = '{"ps": 1}' # Candles
+        self.idle_effect = IDLE_CANDLES
 
-        # Initialize rpi_rf receiver
-        self.rfdevice = RFDevice(17)  # GPIO pin 17
-        self.rfdevice.enable_rx()
         self.last_code_received = None
-        self.logger.info("RF receiver initialized on GPIO 17.")
-        self.radio = Radio(self.config, self.logger)
-        # Start RF listener in a separate thread
-        self.start_rf_listener()
-
-        # Start Idle Candles
-        self.radio.send_command('{"ps": 1}')
+        # Every installation this Tower drives; all of them are fed from the one source below
+        try:
+            layout = site_configs(self.config)
+        except ConfigError as exc:
+            self.logger.error(f"Invalid sites in {config_file}: {exc}")
+            raise
+        self.sites = [Site(name, site_config, self.logger, self.timelines, self.audio, index)
+                      for index, (name, site_config) in enumerate(layout)]
+        self.site_index = SiteIndex(self.sites)
+        # Edits to the config file are compiled on the watcher's thread and swapped in between ticks
+        self.config_watcher = ConfigWatcher(config_file, self.logger, self.compile_config)
+        if len(self.sites) > 1:
+            self.logger.info(f"Monitoring {len(self.sites)} sites: {', '.join(site.name for site in self.sites)}")
+        self.startup.mark('sites')
+        # Where aircraft come from: a ReplayFeed if given, else what the config's ingest names
+        self.source = data_source or self.make_source()
+        self.startup.mark('source')
+        self.nearby_aircraft = []  # Result of the last update, reused until the source has a new one
+
+        # Per-stage loop timers, and a sampling profiler started/stopped by signal or RF code while running
+        self.fetch_timer = StageTimer('fetch')
+        self.process_timer = StageTimer('process')
+        self.display_timer = StageTimer('display')
+        self.decide_timer = StageTimer('decide')
+        self.profiler = SamplingProfiler(self.config.get('profile_dir', './profiles'),
+                                         self.config.get('profile_interval_ms', 5) / 1000, self.logger)
+
+        # hardware=False skips the RF remote and LEDs (benchmarks, replays on a dev box)
+        if hardware:
+            # Initialize rpi_rf receiver
+            from rpi_rf import RFDevice
+            self.rfdevice = RFDevice(17)  # GPIO pin 17
+            self.rfdevice.enable_rx()
+            self.logger.info("RF receiver initialized on GPIO 17.")
+            # Start RF listener in a separate thread
+            self.start_rf_listener()
+
+            # Start Idle Candles
+            for site in self.sites:
+                site.radio.send_command(IDLE_CANDLES)
+            self.startup.mark('rf receiver')
 
-        # MP3 Played Index
-        self.mp3_idx = 0
-        
         # aircraft debug
         self.aircraft_debug = ""
 
@@ -49,7 +82,8 @@ class Tower:
         timestamp = None
         last_processed_timestamp = 0
         debounce_time = 0.5  # Debounce time in seconds (200ms)
-        
+
+        # The RF remote is real hardware, so this thread stays on the wall clock
         while True:
             current_time = time.time()
             if self.rfdevice.rx_code_timestamp != timestamp:
@@ -59,16 +93,21 @@ class Tower:
                     code = self.rfdevice.rx_code
                     if code == self.config['RF_REMOTE_BTN_A']:
                         self.logger.warn(f"Button A pressed")
-                        self.radio.send_command(self.config.get('idle_effects')[self.idle_fx_idx].get('wled_command'))  # Send the command
-                        if self.idle_fx_idx < (len(self.config['idle_effects']) - 1):
-                            self.idle_fx_idx += 1
-                        else:
-                            self.idle_fx_idx = 0
-                        self.idle_effect = self.config['idle_effects'][self.idle_fx_idx - 1]['wled_command']
-                        self.logger.warn(f"IDLE EFFECT SET TO: {self.idle_effect}")
+                        # A reload can swap the list under us at any point; cycle through the one we read
+                        idle_effects = self.timelines['idle_effects']
+                        if idle_effects:
+                            self.idle_effect = idle_effects[self.idle_fx_idx % len(idle_effects)]
+                            self.idle_fx_idx = (self.idle_fx_idx + 1) % len(idle_effects)
+                            for site in self.sites:
+                                site.radio.send_command(self.idle_effect)  # Send the command
+                                site.idle_effect = self.idle_effect
+                            self.logger.warn(f"IDLE EFFECT SET TO: {self.idle_effect}")
                     elif code == self.config['RF_REMOTE_BTN_B']:
                         self.logger.warn(f"Button B pressed")
                         self.play_button_b_effect()
+                    elif self.config.get('RF_REMOTE_PROFILE') and code == self.config['RF_REMOTE_PROFILE']:
+                        self.logger.warn(f"Profiler button pressed")
+                        self.profiler.toggle()
             time.sleep(0.1)
 
 
@@ -90,33 +129,22 @@ class Tower:
         thread.daemon = True
         thread.start()
 
-    #function to trun seconds into string format: ##min:ss
-    def format_time(self, seconds):
-        minutes = seconds // 60
-        seconds = seconds % 60
-        return f"{minutes:.0f}min {seconds:.0f}sec"
-
-    # Returns seconds until chatter is allowed again based on config
-    def can_chatter_when(self):
-        current_time = time.time()
-        elapsed_time = current_time - self.last_chatter_time # time since last chatter
-        allowed_frequency = 3600 / self.config['chatter_per_hour'] # in seconds
-        
-        when_to_chatter = allowed_frequency - elapsed_time
-        if when_to_chatter <= 0:
-            return 0 # chatter is allowed immediately
-
-        # return seconds until next allowed chatter
-        return allowed_frequency - elapsed_time
-
-    # returns True or False if chatter is allowed
-    def can_chatter(self):
-        current_time = time.time()
-        elapsed_time = current_time - self.last_chatter_time
-        allowed_frequency = 3600 / self.config['chatter_per_hour'] # in seconds
-        #self.logger.debug(f"Elapsed time since last chatter: {elapsed_time} seconds")
-        self.chatter_allowed = (elapsed_time >= allowed_frequency)
-        return self.chatter_allowed
+    # The first site: the one button B plays on, and what single-site callers mean by the Tower's radio/fleet
+    @property
+    def primary_site(self):
+        return self.sites[0]
+
+    @property
+    def radio(self):
+        return self.primary_site.radio
+
+    @property
+    def unique_aircraft(self):
+        return self.primary_site.unique_aircraft
+
+    @property
+    def geofence(self):
+        return self.primary_site.geofence
 
     def setup_logging(self):
         self.logger = logging.getLogger('TowerLogger')
@@ -134,107 +162,124 @@ class Tower:
         self.logger.info("Logging setup complete.")
 
     def load_config(self, config_file):
+        # Validate and compile the WLED effects now rather than finding a bad one mid-show
         try:
-            with open(config_file, 'r') as file:
-                self.config = yaml.safe_load(file)
-                self.logger.info("Configuration loaded successfully.")
-        except FileNotFoundError:
-            self.logger.error(f"Configuration file {config_file} not found.")
-            self.config = {}
-        except yaml.YAMLError as exc:
-            self.logger.error(f"Error parsing configuration file: {exc}")
+            self.config, self.timelines, cached = load_compiled_config(config_file)
+            self.logger.info(f"Configuration loaded successfully{' (cached)' if cached else ''}.")
+        except ConfigError as exc:
+            self.logger.error(str(exc))
             self.config = {}
+            self.timelines = compile_effects(self.config)
+        except EffectError as exc:
+            self.logger.error(f"Invalid effect in {config_file}: {exc}")
+            raise
+        self.startup.mark('config')
 
-    # Fetch aircraft from TAR1090 API and process the data
-    def fetch_aircraft_data(self):
+        # Check, measure and preload every configured MP3 before anything can trigger
+        try:
+            self.audio = AudioAssets(self.config, self.logger)
+        except AudioAssetError as exc:
+            self.logger.error(f"Audio problem in {config_file}: {exc}")
+            raise
+        self.startup.mark('audio')
+
+    # Runs on the config watcher's thread: validate a new config and build what it needs.
+    # Raises ValueError (ConfigError, EffectError, AudioAssetError) to keep the running one.
+    def compile_config(self, config, timelines):
+        current = self.config
+        kept = [key for key in RESTART_KEYS if config.get(key) != current.get(key)]
+        for key in kept:
+            if key in current:
+                config[key] = current[key]
+            else:
+                config.pop(key, None)
+        if kept:
+            self.logger.warn(f"Config reload keeps the running {', '.join(kept)}; restart FlightDeck to change them")
+
+        layout = [(name, site_config.get('esp_port')) for name, site_config in site_configs(config)]
+        if layout != [(site.name, site.config.get('esp_port')) for site in self.sites]:
+            raise ConfigError("the sites or their esp_port changed; restart FlightDeck to apply that")
+
+        if all(config.get(key) == current.get(key) for key in AUDIO_KEYS):
+            audio = self.audio
+        else:
+            import pygame
+            audio = AudioAssets(config, self.logger)
+            if pygame.mixer.get_init():
+                audio.preload_sounds()
+        return CompiledConfig(config, timelines, audio)
+
+    # Swap in a config the watcher has compiled; called between ticks
+    def apply_pending_config(self):
+        compiled = self.config_watcher.take()
+        if compiled is None:
+            return
+        changed = changed_keys(self.config, compiled.config)
+        for site, (name, site_config) in zip(self.sites, site_configs(compiled.config)):
+            site.reconfigure(site_config, compiled.timelines, compiled.audio)
+        self.config, self.timelines, self.audio = compiled
+        if self.idle_fx_idx >= len(self.timelines['idle_effects']):
+            self.idle_fx_idx = 0  # The new config has fewer idle effects
+        self.site_index = SiteIndex(self.sites)
+        self.logger.info(f"Reloaded {self.config_file}: {', '.join(changed) or 'no changes'}")
+
+    def make_source(self):
+        ingest = self.config.get('ingest', 'tar1090')
+        if ingest == 'sbs':
+            from sources import SbsSource
+            return SbsSource(self.config.get('sbs_host', 'localhost'), self.config.get('sbs_port', 30003), self.logger)
+        if ingest != 'tar1090':
+            self.logger.error(f"Unknown ingest '{ingest}', polling tar1090 instead.")
         url = self.config.get('tar1090_url', '')
         if not url:
             self.logger.error("tar1090_url is not configured.")
-            return []
-        
+        from tar1090_client import Tar1090Client
+        return Tar1090Client(url, self.config.get('tar1090_timeout', 2))
+
+    # Fetch aircraft from the configured source and process the data
+    def fetch_aircraft_data(self):
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-            aircraft_list = data.get("aircraft", [])
-            #self.logger.info(f"Fetched {len(aircraft_list)} aircraft from {url}.")
-            return self.process_aircraft_data(aircraft_list)
-        except requests.RequestException as e:
+            with self.fetch_timer:
+                aircraft_list = self.source.poll()
+        except (OSError, ParseError) as e:  # requests' RequestException is an OSError
             self.logger.error(f"Error fetching aircraft data: {e}")
             return []
-
-    # Update the data of existing aircraft or create new ones
+        if aircraft_list is None:
+            return self.nearby_aircraft  # Nothing new since the last tick
+        #self.logger.info(f"Fetched {len(aircraft_list)} aircraft.")
+        with self.process_timer:
+            self.nearby_aircraft = self.process_aircraft_data(aircraft_list)
+        AIRCRAFT.set(len(aircraft_list), stage='input')
+        AIRCRAFT.set(sum(len(site.unique_aircraft) for site in self.sites), stage='tracked')
+        AIRCRAFT.set(len(self.nearby_aircraft), stage='nearby')
+        return self.nearby_aircraft
+
+    # Update the data of existing aircraft or create new ones, then filter them
     def process_aircraft_data(self, aircraft_list):
-        #self.logger.debug(f"Monitoring & filtering {len(aircraft_list)} nearby aircraft.")
-        for aircraft_data in aircraft_list:
-            hex_id = aircraft_data.get("hex")
-            if hex_id not in self.unique_aircraft:
-                self.unique_aircraft[hex_id] = Aircraft(self.config, aircraft_data, self.logger)
-            else:
-                #self.logger.debug(f"Updating data for  {aircraft_data.get('flight')}")
-                self.unique_aircraft[hex_id].update_data(aircraft_data)
-
-        # Filter invalid aircraft and aircraft we want to ignore
-        nearby_aircraft = [
-            aircraft for aircraft in self.unique_aircraft.values()
-            if not self.ignore_aircraft(aircraft) and self.valid_aircraft(aircraft)
-        ]
-
-        #self.logger.debug(f"{len(nearby_aircraft)} returned after filtering.")
-
+        self.ingest_aircraft_data(aircraft_list)
+        return self.filter_aircraft()
+
+    # Hand each site the part of the feed that is near it
+    def ingest_aircraft_data(self, aircraft_list):
+        for site, site_aircraft in zip(self.sites, self.site_index.route(aircraft_list)):
+            site.ingest_aircraft_data(site_aircraft)
+
+    # Every site's nearby aircraft, for the display
+    def filter_aircraft(self):
+        nearby_aircraft = []
+        for site in self.sites:
+            nearby_aircraft.extend(site.filter_aircraft())
         return nearby_aircraft
 
-
-    # Check if the aircraft is in the monitoring radius
-    # and invalidate aircraft with bad ADS-B data
-    def valid_aircraft(self, aircraft):
-        if aircraft.altitude == 99999:
-            return False
-        elif aircraft.latitude == 0:
-            return False
-        elif aircraft.longitude == 0:
-            return False
-        elif aircraft.callsign == "Unknown":
-            return False
-        elif aircraft.track == 0:
-            return False
-        elif aircraft.speed == 0:
-            return False
-        elif not aircraft.is_in_monitoring_radius():
-            self.last_seen = time.time()
-            return False
-        else:
-            return True
-
-    def ignore_aircraft(self, aircraft):
-        if aircraft.category.startswith('C'):  # Ignore all ground vehicles
-            return True
-        if aircraft.category.startswith('B'):  # Ignore all ground gliders
-            return True
-        if self.config['ignore_helicopters'] and aircraft.category == 'A7':
-            return True
-        if self.config['ignore_light_aircraft'] and aircraft.category == 'A1':
-            return True
-        if self.config['ignore_small_aircraft'] and aircraft.category == 'A2':
-            return True
-        if self.config['ignore_large_aircraft'] and aircraft.category == 'A3':
-            return True
-        if self.config['ignore_heavy_aircraft'] and aircraft.category == 'A5':
-            return True
-        if self.config['ignore_high_performance_aircraft'] and aircraft.category == 'A6':
-            return True
-        if time.time() - aircraft.last_seen > self.config['expire_old_planes']:
-            return True
-        # Let a plane stay in the stats for 1 min after audio has triggered
-        if aircraft.has_triggered_audio and aircraft.has_triggered_audio + self.config['expire_old_planes'] < time.time():
-            return True
-
-        return False
-
     def monitor_aircraft_with_descent_and_destination(self, stdscr=None):
         try:
             self.initialize_pygame()
-            mp3_files = Aircraft.get_shuffled_mp3_list(self, self.config)
+            self.startup.mark('mixer')
+            self.start_metrics()
+            self.config_watcher.start()
+            for site in self.sites:
+                site.load_mp3_files()
+            first_poll = True
             spinner_index = 0
 
             if stdscr:
@@ -244,40 +289,68 @@ class Tower:
 
 
             while True:
-                time.sleep(.1)
+                clock.sleep(.1)
                 if stdscr:
                     self.display_message(stdscr, '')
 
+                tick_start = time.perf_counter()
                 try:
-                    self.can_chatter()
+                    self.apply_pending_config()
                     nearby_aircraft = self.fetch_aircraft_data()
+                    if first_poll:
+                        first_poll = False
+                        self.startup.mark('first poll')
+                        self.logger.info(self.startup.report())
                     #self.logger.debug(f"={len(nearby_aircraft)} aircraft in {self.config['aircraft_monitoring_radius']} mi radius")
 
-                    if not nearby_aircraft:
-                        time.sleep(0.1)
-
-                    self.update_curses_display(stdscr, nearby_aircraft, spinner_index)
+                    with self.display_timer:
+                        self.update_curses_display(stdscr, nearby_aircraft, spinner_index)
                     spinner_index = (spinner_index + 1) % len(self.spinner_chars)
 
-                    if nearby_aircraft:
-                        self.process_closest_aircraft(stdscr, nearby_aircraft, mp3_files)
+                    with self.decide_timer:
+                        self.update_scheduled_shows()
+                        if nearby_aircraft:
+                            self.process_closest_aircraft(stdscr)
+                    TICK_SECONDS.observe(time.perf_counter() - tick_start)
+
+                    if not nearby_aircraft:
+                        clock.sleep(0.1)
 
                     if stdscr:
                         if stdscr.getch() == ord('q'):
                             break
 
+                except ReplayFinished as e:
+                    self.logger.info(str(e))
+                    break
                 except Exception as e:
                     self.logger.error(f"Error during monitoring loop: {e}")
-                    time.sleep(1)
+                    clock.sleep(1)
 
         except Exception as e:
             self.logger.error(f"Failed to initialize monitoring: {e}")
 
+    # Prometheus text on http://metrics_host:metrics_port/metrics; metrics_port 0 turns it off
+    def start_metrics(self):
+        port = self.config.get('metrics_port', 9109)
+        if not port:
+            return
+        host = self.config.get('metrics_host', '127.0.0.1')
+        try:
+            start_metrics_server(host, port)
+            self.logger.info(f"Metrics on http://{host}:{port}/metrics")
+        except OSError as e:
+            self.logger.error(f"Unable to serve metrics on {host}:{port}: {e}")
+
     def initialize_pygame(self):
-        pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=8192)
+        import pygame
+        pygame.mixer.pre_init(frequency=44100, size=-16, channels=2, buffer=self.audio.mixer_buffer)
         pygame.mixer.init()
+        for site in self.sites:
+            site.radio.setup_playback()
 
     def setup_curses_screen(self, stdscr):
+        import curses
         stdscr.clear()
         
         stdscr.nodelay(True)
@@ -305,35 +378,46 @@ class Tower:
             "Lat   ", "Long  ", "DistToFD", "XXXXXXXXX", "TakeOff", "Landing", 
             "TrigAudio", "InTrigRad", "SpdInRng", "AltInRng", "MovTowFD"
         ]
-        self.aircraft_debug = " | ".join(["\n"+header_data[0], 'Cat', header_data[8]] + header_data[10:17:1])
+        if len(self.sites) > 1:
+            header_data.append("Site")
+        self.aircraft_debug = " | ".join(["\n"+header_data[0], 'Cat', header_data[8]] + header_data[10:])
 
         if stdscr:
-            stdscr.addstr(2, 0, " | ".join(header_data))
+            stdscr.addstr(2, 0, " | ".join(header_data)[:stdscr.getmaxyx()[1] - 1])
 
     def display_aircraft_data(self, stdscr, nearby_aircraft):
         if stdscr:
             height, width = stdscr.getmaxyx()
+        multi_site = len(self.sites) > 1
         for idx, aircraft in enumerate(nearby_aircraft, start=3):
             if stdscr:
                 if idx >= height - 1:
                     break
-                    stdscr.addstr(idx, 0, f"{aircraft.callsign:<8}")
-                    stdscr.addstr(idx, 12, f"{aircraft.category:^8}")
-                    stdscr.addstr(idx, 23, f"{aircraft.id:^9}")
-                    stdscr.addstr(idx, 33, f"{aircraft.track:^6}")
-                    stdscr.addstr(idx, 42, f"{aircraft.altitude:^8}")
-                    stdscr.addstr(idx, 53, f"{aircraft.speed:^5}")
-                    stdscr.addstr(idx, 62, f"{aircraft.latitude:.2f}".center(6))
-                    stdscr.addstr(idx, 71, f"{aircraft.longitude:.2f}".center(6))
-                    stdscr.addstr(idx, 80, f"{aircraft.distance_from_center_miles:.1f} mi".center(7))
-                    stdscr.addstr(idx, 91, f"{self.checked_box if False else self.unchecked_box}".center(9))
-                    stdscr.addstr(idx, 103, f"{self.checked_box if aircraft.is_takeoff else self.unchecked_box}".center(8))
-                    stdscr.addstr(idx, 113, f"{self.checked_box if aircraft.is_landing else self.unchecked_box}".center(8))
-                    stdscr.addstr(idx, 123, f"{self.checked_box if aircraft.has_triggered_audio else self.unchecked_box}".center(9))
-                    stdscr.addstr(idx, 135, f"{self.checked_box if aircraft.is_in_trigger_radius() else self.unchecked_box}".center(9))
-                    stdscr.addstr(idx, 147, f"{self.checked_box if aircraft.is_speed_within_range() else self.unchecked_box}".center(8))
-                    stdscr.addstr(idx, 158, f"{self.checked_box if aircraft.is_altitude_within_range() else self.unchecked_box}".center(8))
-                    stdscr.addstr(idx, 169, f"{self.checked_box if aircraft.is_moving_towards_flight_deck() else self.unchecked_box}".center(8))
+                cells = [
+                    (0, f"{aircraft.callsign:<8}"),
+                    (12, f"{aircraft.category:^8}"),
+                    (23, f"{aircraft.id:^9}"),
+                    (33, f"{aircraft.track:^6}"),
+                    (42, f"{aircraft.altitude:^8}"),
+                    (53, f"{aircraft.speed:^5}"),
+                    (62, f"{aircraft.latitude:.2f}".center(6)),
+                    (71, f"{aircraft.longitude:.2f}".center(6)),
+                    (80, f"{aircraft.distance_from_center_miles:.1f} mi".center(7)),
+                    (91, f"{self.checked_box if False else self.unchecked_box}".center(9)),
+                    (103, f"{self.checked_box if aircraft.is_takeoff else self.unchecked_box}".center(8)),
+                    (113, f"{self.checked_box if aircraft.is_landing else self.unchecked_box}".center(8)),
+                    (123, f"{self.checked_box if aircraft.has_triggered_audio else self.unchecked_box}".center(9)),
+                    (135, f"{self.checked_box if aircraft.is_in_trigger_radius() else self.unchecked_box}".center(9)),
+                    (147, f"{self.checked_box if aircraft.is_speed_within_range() else self.unchecked_box}".center(8)),
+                    (158, f"{self.checked_box if aircraft.is_altitude_within_range() else self.unchecked_box}".center(8)),
+                    (169, f"{self.checked_box if aircraft.is_moving_towards_flight_deck() else self.unchecked_box}".center(8)),
+                ]
+                if multi_site:
+                    cells.append((180, aircraft.radio.name))
+                for column, text in cells:
+                    if column + len(text) >= width:
+                        break  # Columns past the edge of the terminal would raise curses.error
+                    stdscr.addstr(idx, column, text)
             else:
                 self.aircraft_debug += f"\n{aircraft.callsign:<11} "
                 self.aircraft_debug += f"{aircraft.category:^5} "
@@ -345,44 +429,28 @@ class Tower:
                 self.aircraft_debug += f"{'x' if aircraft.is_speed_within_range() else '-':^10} "
                 self.aircraft_debug += f"{'x' if aircraft.is_altitude_within_range() else '-':^10} "
                 self.aircraft_debug += f"{'x' if aircraft.is_moving_towards_flight_deck() else '-':^10}"
+                if multi_site:
+                    self.aircraft_debug += f"  {aircraft.radio.name}"
         self.logger.debug(self.aircraft_debug + "\n" + "-" * 103)
 
 
-    def process_closest_aircraft(self, stdscr, nearby_aircraft, mp3_files):
-        closest_aircraft = min(nearby_aircraft, key=lambda ac: ac.calculate_closest_distance())
-        total_action_time = 1  # closest_aircraft.calculate_closest_distance() * 60
-
-        if not closest_aircraft.has_triggered_audio:
-            if closest_aircraft.is_in_trigger_radius() and closest_aircraft.is_speed_within_range() and closest_aircraft.is_altitude_within_range() and closest_aircraft.is_moving_towards_flight_deck():
-                if self.can_chatter():
-                    if mp3_files and self.can_chatter():
-                        self.logger.debug(f"Playing MP3 for {closest_aircraft.callsign}")
-                        closest_aircraft.radio.play_mp3_file(stdscr, closest_aircraft.callsign, mp3_files[self.mp3_idx], closest_aircraft.distance_from_center_miles, closest_aircraft.speed, self.idle_effect)
-                        closest_aircraft.has_triggered_audio = time.time()  # Update flag after playing the audio
-                        if self.mp3_idx < len(mp3_files)-1:
-                            self.mp3_idx += 1
-                        else:
-                            self.mp3_idx = 0
-                        self.last_chatter_time = time.time()  # Update last chatter time for use in chatter frequency calculations
-                        self.logger.info(f"Playing MP3 for aircraft: {closest_aircraft.callsign}")
-                    else:
-                        if stdscr:
-                            self.display_message(stdscr, "No MP3 files to play.")
-                else: 
-                    if self.config['always_light_runway']:
-                        self.radio.light_runway(closest_aircraft.callsign, closest_aircraft.distance_from_center_miles, closest_aircraft.speed, self.idle_effect)
-                        closest_aircraft.has_triggered_audio = time.time()  # Update flag after lighting runway
-                    self.display_message(stdscr, f"{self.format_time(self.can_chatter_when())} until chatter allowed.")
-            else:
-                messages = []
-                if not self.can_chatter():
-                    self.logger.warn(f"{self.format_time(self.can_chatter_when())} until chatter allowed.")
-                    messages.append(f"{self.format_time(self.can_chatter_when())} until chatter allowed.")
-                if stdscr:
-                    self.display_message(stdscr, "; ".join(messages))
+    # Each site decides on its own aircraft against its own chatter budget
+    def process_closest_aircraft(self, stdscr):
+        messages = []
+        for site in self.sites:
+            message = site.process_closest_aircraft()
+            if message:
+                messages.append(message if len(self.sites) == 1 else f"{site.name}: {message}")
+        if messages:
+            self.display_message(stdscr, "; ".join(messages))
+
+    def update_scheduled_shows(self):
+        for site in self.sites:
+            site.update_scheduled_shows()
 
     def display_message(self, stdscr, message):
         if stdscr:
+            import curses
             stdscr.addstr(1, 0, message, curses.color_pair(1))
             stdscr.refresh()
-            time.sleep(.2)
+            clock.sleep(.2)